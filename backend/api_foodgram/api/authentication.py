@@ -0,0 +1,95 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class TokenCache:
+    """Ограниченный LRU-кэш токенов в памяти процесса.
+
+    Ключ — sha256 токена, значение — токен с уже загруженным
+    пользователем и время истечения записи. Сигналы удаляют запись при
+    выходе (удалении токена) и при любом сохранении пользователя, кроме
+    обновления last_login: смене пароля, блокировке, правке профиля.
+    Как и для фрагментов рецептов, запись удаляется после фиксации
+    транзакции, чтобы параллельный запрос не закэшировал ещё не
+    изменённого пользователя. Другие процессы узнают об изменениях
+    не позже чем через TOKEN_CACHE_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._tokens.get(digest)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._tokens[digest]
+                return None
+            self._tokens.move_to_end(digest)
+            return token
+
+    def set(self, digest, token):
+        if settings.TOKEN_CACHE_SIZE <= 0:
+            return
+        expires_at = time.monotonic() + settings.TOKEN_CACHE_TTL
+        with self._lock:
+            self._tokens[digest] = (token, expires_at)
+            self._tokens.move_to_end(digest)
+            while len(self._tokens) > settings.TOKEN_CACHE_SIZE:
+                self._tokens.popitem(last=False)
+
+    def _delete_token(self, key):
+        with self._lock:
+            self._tokens.pop(token_digest(key), None)
+
+    def _delete_user(self, user_id):
+        with self._lock:
+            digests = [
+                digest for digest, (token, _) in self._tokens.items()
+                if token.user_id == user_id
+            ]
+            for digest in digests:
+                del self._tokens[digest]
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def invalidate_token(self, key):
+        transaction.on_commit(lambda: self._delete_token(key))
+
+    def invalidate_user(self, user_id):
+        transaction.on_commit(lambda: self._delete_user(user_id))
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к БД для известных токенов.
+
+    Каждый запрос получает свою копию пользователя, чтобы изменения
+    request.user в одном запросе не попадали в другие.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        token = token_cache.get(digest)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(digest, token)
+        return copy.copy(token.user), token
@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+from api.serializers import TagSerializer
+from django.conf import settings
+from django.core.cache import cache
+from recipes.models import Tag
+
+TAG_VERSION_KEY = 'tags:version'
+TAG_CATALOGUE_KEY = 'tags:catalogue:{version}'
+
+
+class TagCatalogue:
+    """Список тэгов в кэше Django с версией и ETag.
+
+    Сохранение или удаление тэга увеличивает версию, поэтому каталог,
+    собранный параллельно со сменой данных, попадает под старый ключ
+    и больше не читается. Версия меняется только в кэше процесса,
+    сохранившего тэг, поэтому с кэшем в памяти другие процессы видят
+    изменения, когда истекает TAG_CATALOGUE_TIMEOUT их каталога. Сама
+    версия хранится без срока: после сброса к единице снова читался бы
+    каталог, сохранённый под ней раньше.
+    """
+
+    def version(self):
+        cache.add(TAG_VERSION_KEY, 1, timeout=None)
+        return cache.get(TAG_VERSION_KEY, 1)
+
+    def invalidate(self):
+        try:
+            cache.incr(TAG_VERSION_KEY)
+        except ValueError:
+            cache.add(TAG_VERSION_KEY, 1, timeout=None)
+
+    def get(self):
+        key = TAG_CATALOGUE_KEY.format(version=self.version())
+        catalogue = cache.get(key)
+        if catalogue is None:
+            tags = TagSerializer(Tag.objects.all(), many=True).data
+            content = json.dumps(tags, sort_keys=True).encode()
+            catalogue = {
+                'tags': tags,
+                'slugs': {tag['slug'] for tag in tags},
+                'etag': f'"{hashlib.md5(content).hexdigest()}"',
+            }
+            cache.set(key, catalogue, timeout=settings.TAG_CATALOGUE_TIMEOUT)
+        return catalogue
+
+    def ids(self, slugs):
+        return [
+            tag['id'] for tag in self.get()['tags'] if tag['slug'] in slugs
+        ]
+
+    def choices(self):
+        return [(slug, slug) for slug in sorted(self.get()['slugs'])]
+
+
+tag_catalogue = TagCatalogue()
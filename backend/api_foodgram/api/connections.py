@@ -0,0 +1,73 @@
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+EVENTS = ('opened', 'reused', 'checked', 'discarded')
+
+
+class ConnectionMonitor:
+    """Проверка постоянных соединений с БД перед запросом и их статистика.
+
+    Django 3.2 отдаёт запросу соединение, оставшееся от предыдущего,
+    не проверяя его. Если PostgreSQL закрыл его, пока воркер простаивал,
+    запрос падает с ошибкой. Поэтому соединение, простоявшее дольше
+    DB_CONN_HEALTH_CHECK_AFTER секунд, перед запросом проверяется через
+    is_usable() (SELECT 1), а неработающее закрывается — Django откроет
+    новое при первом обращении. Занятый воркер проверку не платит.
+
+    Счётчики общие для процесса: opened — открыто соединений, reused —
+    запросов, получивших открытое соединение, checked — проверок,
+    discarded — закрытых после неудачной проверки.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._released_at = weakref.WeakKeyDictionary()
+
+    def _count(self, alias, event):
+        with self._lock:
+            self._stats.setdefault(alias, dict.fromkeys(EVENTS, 0))[event] += 1
+
+    def connection_created(self, connection, **kwargs):
+        self._count(connection.alias, 'opened')
+
+    def request_started(self, **kwargs):
+        for connection in connections.all():
+            if connection.connection is None:
+                continue
+            self._count(connection.alias, 'reused')
+            with self._lock:
+                released_at = self._released_at.get(connection, 0)
+            idle = time.monotonic() - released_at
+            if idle < settings.DB_CONN_HEALTH_CHECK_AFTER:
+                continue
+            self._count(connection.alias, 'checked')
+            if not connection.is_usable():
+                self._count(connection.alias, 'discarded')
+                connection.close()
+
+    def request_finished(self, **kwargs):
+        now = time.monotonic()
+        for connection in connections.all():
+            if connection.connection is not None:
+                with self._lock:
+                    self._released_at[connection] = now
+
+    def stats(self):
+        with self._lock:
+            return {
+                alias: {
+                    'conn_max_age': connections[alias].settings_dict[
+                        'CONN_MAX_AGE'
+                    ],
+                    **counters,
+                }
+                for alias, counters in self._stats.items()
+            }
+
+
+connection_monitor = ConnectionMonitor()
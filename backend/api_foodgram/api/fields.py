@@ -0,0 +1,21 @@
+import hashlib
+
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+
+
+class HashedBase64ImageField(Base64ImageField):
+    """Сохраняет изображение под именем из хэша содержимого.
+
+    Если такой файл уже есть в хранилище, повторно он не записывается:
+    полю модели передаётся имя существующего файла.
+    """
+
+    def get_file_name(self, decoded_file):
+        return hashlib.sha256(decoded_file).hexdigest()
+
+    def to_internal_value(self, base64_data):
+        image = super().to_internal_value(base64_data)
+        if image is not None and default_storage.exists(image.name):
+            return image.name
+        return image
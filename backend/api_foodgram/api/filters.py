@@ -1,18 +1,32 @@
 import django_filters
-from recipes.models import IngredientName, Recipe, Tag
+from api.caches import tag_catalogue
+from django.db.models import Exists, OuterRef
+from recipes.models import IngredientName, Recipe
+from recipes.search import search_backend
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
 FILTER_CHOICES = (
     (1, True),
     (0, False)
 )
 FLAG_ON = '1'
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+TAGS_MATCH_CHOICES = (
+    (TAGS_MATCH_ANY, 'Любой из тэгов'),
+    (TAGS_MATCH_ALL, 'Все тэги'),
+)
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_catalogue.choices,
         field_name='tags__slug',
-        to_field_name='slug'
+        method='tags_filter'
+    )
+    tags_match = django_filters.ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES,
+        method='tags_match_filter'
     )
     author = django_filters.CharFilter(
         field_name='author',
@@ -31,7 +45,36 @@ class RecipeFilter(django_filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags',
+            'tags_match',
+            'author',
+            'is_in_shopping_cart',
+            'is_favorited'
+        )
+
+    def tags_filter(self, queryset, name, value):
+        """Фильтр через EXISTS по таблице связей, без JOIN и DISTINCT.
+
+        По умолчанию рецепт подходит, если у него есть любой из тэгов,
+        при tags_match=all — только если есть все.
+        """
+        tag_ids = tag_catalogue.ids(value)
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_match') != TAGS_MATCH_ALL:
+            return queryset.filter(
+                Exists(recipe_tags.filter(tag__in=tag_ids))
+            )
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                Exists(recipe_tags.filter(tag=tag_id))
+            )
+        return queryset
+
+    def tags_match_filter(self, queryset, name, value):
+        return queryset
 
     def is_in_shopping_cart_filter(self, queryset, name, value):
         if value == FLAG_ON:
@@ -44,6 +87,25 @@ class RecipeFilter(django_filters.FilterSet):
         return queryset
 
 
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по ?search= с сортировкой по релевантности.
+
+    Явный ?ordering= важнее релевантности. В режиме курсора позиция
+    тоже задаётся релевантностью, а рецепты с равной релевантностью
+    различаются смещением.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = search_backend(queryset.db).search(queryset, query)
+        if OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.order_by('-search_rank', '-id')
+
+
 class NameFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(
         lookup_expr='istartswith',
@@ -0,0 +1,102 @@
+from api.routers import replica_alias
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+FRAGMENT_VERSION_KEY = 'recipes:fragments:version'
+FRAGMENT_KEY = 'recipes:fragment:{version}:{recipe_id}'
+CHANGED_KEY = 'recipes:fragments:changed'
+RECIPE_CHANGED_KEY = 'recipes:fragment:changed:{recipe_id}'
+
+
+class RecipeFragmentCache:
+    """Кэш не зависящей от пользователя части сериализованного рецепта.
+
+    Ключ состоит из id рецепта и общей версии. Сохранение рецепта
+    удаляет только его фрагмент (тэги и ингредиенты меняются в той же
+    транзакции, что и сам рецепт), изменение тэга, ингредиента или
+    другого общего справочника увеличивает версию. Сброс выполняется
+    после фиксации транзакции, чтобы параллельный запрос не положил
+    в кэш ещё не изменённые данные. Фрагменты живут не дольше
+    RECIPE_FRAGMENT_TIMEOUT секунд: это ограничивает устаревание,
+    если данные изменили в обход сигналов или в другом процессе при
+    кэше в памяти процесса.
+
+    При чтении с реплики фрагменты рецептов, изменённых за последние
+    DB_REPLICA_PIN_SECONDS секунд, не кэшируются: реплика могла ещё
+    не получить изменения.
+    """
+
+    def version(self):
+        cache.add(FRAGMENT_VERSION_KEY, 1, timeout=None)
+        return cache.get(FRAGMENT_VERSION_KEY, 1)
+
+    def key(self, recipe_id, version):
+        return FRAGMENT_KEY.format(version=version, recipe_id=recipe_id)
+
+    def get_many(self, recipe_ids, version):
+        keys = {self.key(recipe_id, version): recipe_id
+                for recipe_id in recipe_ids}
+        return {
+            keys[key]: fragment
+            for key, fragment in cache.get_many(keys).items()
+        }
+
+    def _recently_changed(self, recipe_ids):
+        keys = {RECIPE_CHANGED_KEY.format(recipe_id=recipe_id): recipe_id
+                for recipe_id in recipe_ids}
+        changed = cache.get_many([CHANGED_KEY, *keys])
+        if CHANGED_KEY in changed:
+            return set(recipe_ids)
+        return {keys[key] for key in changed}
+
+    def _mark_changed(self, keys):
+        if settings.DB_REPLICA_ALIASES:
+            cache.set_many(
+                dict.fromkeys(keys, 1),
+                timeout=settings.DB_REPLICA_PIN_SECONDS
+            )
+
+    def set_many(self, fragments, version):
+        if replica_alias.get():
+            changed = self._recently_changed(fragments)
+            fragments = {
+                recipe_id: fragment
+                for recipe_id, fragment in fragments.items()
+                if recipe_id not in changed
+            }
+        cache.set_many(
+            {
+                self.key(recipe_id, version): fragment
+                for recipe_id, fragment in fragments.items()
+            },
+            timeout=settings.RECIPE_FRAGMENT_TIMEOUT
+        )
+
+    def _delete(self, recipe_ids):
+        version = self.version()
+        cache.delete_many(
+            [self.key(recipe_id, version) for recipe_id in recipe_ids]
+        )
+        self._mark_changed(
+            RECIPE_CHANGED_KEY.format(recipe_id=recipe_id)
+            for recipe_id in recipe_ids
+        )
+
+    def _increment_version(self):
+        try:
+            cache.incr(FRAGMENT_VERSION_KEY)
+        except ValueError:
+            cache.add(FRAGMENT_VERSION_KEY, 1, timeout=None)
+        self._mark_changed([CHANGED_KEY])
+
+    def invalidate(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if recipe_ids:
+            transaction.on_commit(lambda: self._delete(recipe_ids))
+
+    def invalidate_all(self):
+        transaction.on_commit(self._increment_version)
+
+
+recipe_fragments = RecipeFragmentCache()
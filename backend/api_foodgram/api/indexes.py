@@ -0,0 +1,84 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from recipes.models import IngredientName
+
+
+class IngredientNameIndex:
+    """Отсортированный индекс наименований ингредиентов в памяти процесса.
+
+    Строится лениво при первом обращении и сбрасывается сигналами
+    post_save/post_delete модели IngredientName. Чтобы другие процессы
+    не отдавали устаревшие данные, индекс также перестраивается по
+    истечении INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._ingredients = None
+        self._built_at = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._ingredients = None
+
+    def _is_fresh(self):
+        age = time.monotonic() - self._built_at
+        return (
+            self._keys is not None
+            and age < settings.INGREDIENT_INDEX_TTL
+        )
+
+    def _build(self):
+        ingredients = sorted(
+            IngredientName.objects.all(),
+            key=lambda ingredient: (ingredient.name.lower(), ingredient.id)
+        )
+        self._keys = [ingredient.name.lower() for ingredient in ingredients]
+        self._ingredients = ingredients
+        self._built_at = time.monotonic()
+
+    def _snapshot(self):
+        with self._lock:
+            if not self._is_fresh():
+                self._build()
+            return self._keys, self._ingredients
+
+    def all(self):
+        _, ingredients = self._snapshot()
+        return sorted(ingredients, key=lambda ingredient: ingredient.id)
+
+    def prefix(self, query, limit):
+        keys, ingredients = self._snapshot()
+        query = query.lower()
+        start = bisect_left(keys, query)
+        end = start
+        while (
+            end < len(keys)
+            and end - start < limit
+            and keys[end].startswith(query)
+        ):
+            end += 1
+        return ingredients[start:end]
+
+    def search(self, query, limit=None):
+        """Сначала совпадения по началу строки, затем по подстроке."""
+        if limit is None:
+            limit = settings.INGREDIENT_SEARCH_LIMIT
+        found = self.prefix(query, limit)
+        if len(found) < limit:
+            query = query.lower()
+            keys, ingredients = self._snapshot()
+            for key, ingredient in zip(keys, ingredients):
+                if query in key and not key.startswith(query):
+                    found.append(ingredient)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+ingredient_index = IngredientNameIndex()
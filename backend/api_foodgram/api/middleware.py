@@ -0,0 +1,31 @@
+from api.routers import replica_alias, replica_pinning
+from django.conf import settings
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтения GET- и HEAD-запросов на реплику.
+
+    Без DB_REPLICAS ничего не делает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DB_REPLICA_ALIASES:
+            return self.get_response(request)
+        client = replica_pinning.client(request)
+        if request.method not in READ_METHODS:
+            response = self.get_response(request)
+            if client is not None:
+                replica_pinning.pin(client)
+            return response
+        if replica_pinning.is_pinned(client):
+            return self.get_response(request)
+        token = replica_alias.set(replica_pinning.next_replica())
+        try:
+            return self.get_response(request)
+        finally:
+            replica_alias.reset(token)
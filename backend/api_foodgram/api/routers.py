@@ -0,0 +1,90 @@
+import hashlib
+import itertools
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PINNED_KEY = 'db:pinned:{client}'
+# Всегда читаются с основной БД: без токенов и сессий клиент не узнает
+# себя сразу после входа, пока реплика отстаёт, а из тэгов и
+# ингредиентов собираются общие кэши, которые живут дольше отставания.
+PRIMARY_ONLY_MODELS = {
+    'authtoken.token',
+    'sessions.session',
+    'recipes.tag',
+    'recipes.ingredientname',
+}
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Чтения в безопасных запросах — с реплики, остальное — с основной БД.
+
+    Реплику для запроса выбирает ReplicaRoutingMiddleware, по кругу.
+    Вне запроса (команды, миграции, сигналы после записи) всё идёт
+    в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return 'default'
+        return replica_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaPinning:
+    """Выбор реплики и закрепление клиента за основной БД после записи.
+
+    Клиент определяется по заголовку Authorization или сессионной куке.
+    После небезопасного запроса он DB_REPLICA_PIN_SECONDS секунд читает
+    с основной БД и видит свои изменения, даже если реплика отстаёт.
+    Отметка хранится в кэше Django, поэтому с файловым кэшем она общая
+    для всех воркеров.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aliases = None
+        self._replicas = None
+
+    def next_replica(self):
+        with self._lock:
+            if self._aliases != settings.DB_REPLICA_ALIASES:
+                self._aliases = settings.DB_REPLICA_ALIASES
+                self._replicas = itertools.cycle(self._aliases)
+            return next(self._replicas)
+
+    def client(self, request):
+        credentials = (
+            request.META.get('HTTP_AUTHORIZATION')
+            or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        if credentials:
+            return hashlib.sha256(credentials.encode()).hexdigest()
+        return None
+
+    def is_pinned(self, client):
+        return client is not None and cache.get(
+            PINNED_KEY.format(client=client)
+        ) is not None
+
+    def pin(self, client):
+        cache.set(
+            PINNED_KEY.format(client=client),
+            1,
+            timeout=settings.DB_REPLICA_PIN_SECONDS
+        )
+
+
+replica_pinning = ReplicaPinning()
@@ -1,14 +1,19 @@
+from api.fields import HashedBase64ImageField
+from api.fragments import recipe_fragments
 from api_foodgram.settings import (ALREADY_CREATED, FRIENDLY_FIRE,
                                    HAVE_NOT_OBJECT_FOR_DELETE, ID_NOT_FOUND,
                                    IS_A_POSITIVE_INT, NOT_NULL_PARAMETER)
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, IngredientName, Recipe,
+from recipes import cart
+from recipes.images import rendition_urls
+from recipes.models import (Favorite, IngredientName, Recipe, RecipeIngredient,
                             ShoppingCart, Subscription, Tag)
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
+from rest_framework.fields import SkipField
 from rest_framework.permissions import SAFE_METHODS
 
 User = get_user_model()
@@ -35,11 +40,20 @@ class DjoserUserSerializer(DjoserUserCreateSerializer):
         parent_fields.append('is_subscribed')
         fields = parent_fields
 
+    def get_subscribed_ids(self):
+        request = self.context.get('request')
+        if not hasattr(request, 'subscribed_ids'):
+            request.subscribed_ids = set(
+                Subscription.objects.filter(
+                    author=request.user.id
+                ).values_list('user', flat=True)
+            ) if request.user.is_authenticated else set()
+        return request.subscribed_ids
+
     def get_is_subscribed(self, obj):
-        return Subscription.objects.filter(
-            user=obj.id,
-            author=self.context.get('request').user.id
-        ).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in self.get_subscribed_ids()
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -55,12 +69,13 @@ class IngredientNameSerializer(serializers.ModelSerializer):
 
 
 class IngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient_name_id')
     name = serializers.SerializerMethodField()
     measurement_unit = serializers.SerializerMethodField()
 
     class Meta:
         fields = 'id', 'amount', 'name', 'measurement_unit'
-        model = Ingredient
+        model = RecipeIngredient
 
     def get_name(self, obj):
         return obj.ingredient_name.name
@@ -77,34 +92,140 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class IngredientCreateSerializer(IngredientSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=IngredientName.objects.all(),
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         fields = 'id', 'amount'
-        model = Ingredient
+        model = RecipeIngredient
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        fragments = self.child.get_fragments(recipes)
+        return [
+            self.child.to_representation(recipe, fragments.get(recipe.id))
+            for recipe in recipes
+        ]
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True)
+    """Рецепт для чтения.
+
+    Поля из fragment_fields не зависят от пользователя и запроса,
+    поэтому берутся из recipe_fragments, а вложенные сериализаторы
+    и prefetch тэгов и ингредиентов выполняются только для рецептов,
+    которых нет в кэше. Остальные поля считаются на каждый запрос.
+    """
+    image = HashedBase64ImageField(max_length=None, use_url=True)
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
-    ingredients = IngredientSerializer(many=True, read_only=True)
+    ingredients = IngredientSerializer(
+        source='recipe_ingredients',
+        many=True,
+        read_only=True
+    )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
+
+    fragment_fields = (
+        'id',
+        'tags',
+        'author',
+        'ingredients',
+        'name',
+        'text',
+        'cooking_time'
+    )
 
     class Meta:
-        fields = '__all__'
+        exclude = (
+            'favorites_count',
+            'cart_count',
+            'similarity_outdated',
+            'renditions'
+        )
         model = Recipe
+        list_serializer_class = RecipeListSerializer
+
+    def build_fragment(self, recipe):
+        return {
+            name: self.fields[name].to_representation(
+                self.fields[name].get_attribute(recipe)
+            )
+            for name in self.fragment_fields
+        }
+
+    def get_fragments(self, recipes):
+        if not self.fragment_fields:
+            return {}
+        version = recipe_fragments.version()
+        fragments = recipe_fragments.get_many(
+            [recipe.id for recipe in recipes],
+            version
+        )
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            prefetch_related_objects(
+                missing,
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient_name'
+                    )
+                )
+            )
+            built = {recipe.id: self.build_fragment(recipe)
+                     for recipe in missing}
+            recipe_fragments.set_many(built, version)
+            fragments.update(built)
+        return fragments
+
+    def to_representation(self, instance, fragment=None):
+        if fragment is None:
+            fragment = self.get_fragments([instance]).get(instance.id)
+        if fragment is None:
+            return super().to_representation(instance)
+        representation = {}
+        for field in self._readable_fields:
+            if field.field_name in fragment:
+                representation[field.field_name] = fragment[field.field_name]
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            representation[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return representation
+
+    def get_image_renditions(self, obj):
+        if not obj.image:
+            return {}
+        request = self.context.get('request')
+        urls = rendition_urls(obj)
+        if request is None:
+            return urls
+        return {
+            rendition: request.build_absolute_uri(url)
+            for rendition, url in urls.items()
+        }
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorite.objects.filter(
             author=self.context.get('request').user.id,
             recipe=obj.id
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return ShoppingCart.objects.filter(
             author=self.context.get('request').user.id,
             recipe=obj.id
@@ -112,7 +233,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = HashedBase64ImageField(max_length=None, use_url=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
@@ -126,16 +247,16 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     def validate_ingredients(self, value):
         ingredient_ids = [
-            ingredient.get('id').id
+            ingredient.get('id')
             for ingredient in value
         ]
         if not len(value):
             raise serializers.ValidationError(
                 NOT_NULL_PARAMETER.format(name='ингредиент')
             )
-        if IngredientName.objects.filter(
-                id__in=ingredient_ids
-        ).count() != len(value):
+        if len(
+                IngredientName.objects.in_bulk(ingredient_ids)
+        ) != len(value):
             raise serializers.ValidationError(
                 ID_NOT_FOUND.format(name='ингредиент')
             )
@@ -161,41 +282,100 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     )
         return obj
 
-    def ingredients_create(self, ingredients_data):
-        ingredients = []
-        for ingredient in ingredients_data:
-            ingredient_name = get_object_or_404(
-                IngredientName,
-                id=ingredient.get('id').id
+    def ingredients_create(self, recipe, ingredients_data):
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_name_id=ingredient.get('id'),
+                amount=ingredient.get('amount')
             )
-            ingredient, _ = Ingredient.objects.get_or_create(
-                ingredient_name=ingredient_name,
-                amount=ingredient.get('amount'),
-            )
-            ingredients.append(ingredient)
-        return ingredients
+            for ingredient in ingredients_data
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
-        ingredients = self.ingredients_create(ingredients)
-        recipe.ingredients.set(ingredients)
+        self.ingredients_create(recipe, ingredients)
         return recipe
 
+    def ingredients_update(self, recipe, ingredients_data):
+        """Приводит ингредиенты рецепта к присланным, не трогая совпавшие.
+
+        Возвращает True, если хоть одна строка изменилась.
+        """
+        current = {
+            ingredient.ingredient_name_id: ingredient
+            for ingredient in recipe.recipe_ingredients.all()
+        }
+        submitted = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients_data
+        }
+        removed = [
+            current[name_id].id for name_id in current.keys() - submitted
+        ]
+        changed = []
+        for name_id, amount in submitted.items():
+            ingredient = current.get(name_id)
+            if ingredient is not None and ingredient.amount != amount:
+                ingredient.amount = amount
+                changed.append(ingredient)
+        added = [
+            {'id': name_id, 'amount': submitted[name_id]}
+            for name_id in submitted.keys() - current.keys()
+        ]
+        if not (removed or changed or added):
+            return False
+        with cart.recipe_changes(recipe):
+            if removed:
+                RecipeIngredient.objects.filter(id__in=removed).delete()
+            if changed:
+                RecipeIngredient.objects.bulk_update(changed, ('amount',))
+            if added:
+                self.ingredients_create(recipe, added)
+        return True
+
+    def tags_update(self, recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+        return current != submitted
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        tags = validated_data.pop('tags')
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        ingredients = self.ingredients_create(ingredients)
-        instance.ingredients.set(ingredients)
-        return super().update(
-            instance,
-            validated_data
-        )
+        validated_data.pop('author', None)
+        relations_changed = False
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            relations_changed |= self.tags_update(instance, tags)
+        ingredients = validated_data.pop('ingredients', None)
+        ingredients_changed = False
+        if ingredients is not None:
+            ingredients_changed = self.ingredients_update(
+                instance,
+                ingredients
+            )
+        relations_changed |= ingredients_changed
+        update_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in update_fields:
+            setattr(instance, field, validated_data[field])
+        if ingredients_changed and not instance.similarity_outdated:
+            instance.similarity_outdated = True
+            update_fields.append('similarity_outdated')
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        elif relations_changed:
+            recipe_fragments.invalidate([instance.id])
+        return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -204,8 +384,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
 
 class SubscriptionRecipeSerializer(RecipeReadSerializer):
+    fragment_fields = ()
+
     class Meta:
-        fields = 'id', 'name', 'image', 'cooking_time'
+        fields = 'id', 'name', 'image', 'image_renditions', 'cooking_time'
         model = Recipe
 
 
@@ -227,10 +409,13 @@ class SubscriptionSerializer(DjoserUserSerializer):
         model = User
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()[:self.context.get('recipes_limit')]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()[:self.context.get('recipes_limit')]
         return SubscriptionRecipeSerializer(recipes, many=True).data
 
 
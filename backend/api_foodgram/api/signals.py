@@ -0,0 +1,73 @@
+from api.authentication import token_cache
+from api.caches import tag_catalogue
+from api.connections import connection_monitor
+from api.fragments import recipe_fragments
+from api.indexes import ingredient_index
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.images import schedule_renditions
+from recipes.models import IngredientName, Recipe, Tag, User
+from rest_framework.authtoken.models import Token
+
+
+@receiver(post_save, sender=IngredientName)
+@receiver(post_delete, sender=IngredientName)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalogue(**kwargs):
+    tag_catalogue.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_renditions(instance, update_fields, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.image:
+        schedule_renditions(instance.image.name)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_fragment(instance, **kwargs):
+    recipe_fragments.invalidate([instance.id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(instance, created, update_fields, **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    recipe_fragments.invalidate(
+        instance.recipes.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(instance, **kwargs):
+    token_cache.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    token_cache.invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=IngredientName)
+@receiver(post_delete, sender=IngredientName)
+def invalidate_all_fragments(**kwargs):
+    recipe_fragments.invalidate_all()
+
+
+request_started.connect(connection_monitor.request_started)
+request_finished.connect(connection_monitor.request_finished)
+connection_created.connect(connection_monitor.connection_created)
@@ -1,5 +1,5 @@
-from api.views import (DjoserUserViewSet, IngredientViewSet, RecipeViewSet,
-                       TagViewSet)
+from api.views import (DatabaseStatsView, DjoserUserViewSet, IngredientViewSet,
+                       RecipeViewSet, TagViewSet)
 from django.urls import include, path
 from rest_framework import routers
 
@@ -12,6 +12,7 @@ router.register('ingredients', IngredientViewSet, basename='ingredient-list')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('db-stats/', DatabaseStatsView.as_view(), name='db-stats'),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken'))
 ]
@@ -1,19 +1,68 @@
+import csv
+import json
 
-def shopping_cart_data_creator(user):
-    ingredients_count = {}
-    for cart_objects in user.cart.all():
-        for ingredient in cart_objects.recipe.ingredients.all():
-            key = (
-                ingredient.ingredient_name.name
-                + ' ('
-                + ingredient.ingredient_name.measurement_unit
-                + ')'
-            )
-            if key in ingredients_count:
-                ingredients_count[key] += ingredient.amount
-            else:
-                ingredients_count[key] = ingredient.amount
-    cart_data = ''
-    for key, value in ingredients_count.items():
-        cart_data += str(key) + ": " + str(value) + '\n'
-    return cart_data
+from django.db.models import Sum
+from recipes.models import ShoppingCartTotal
+
+SHOPPING_CART_FILENAME = 'shopping_list.{format}'
+SHOPPING_CART_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_totals(user):
+    return ShoppingCartTotal.objects.filter(author=user).values(
+        'ingredient_name__name',
+        'ingredient_name__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).values_list(
+        'ingredient_name__name',
+        'ingredient_name__measurement_unit',
+        'total'
+    ).order_by('ingredient_name__name')
+
+
+def shopping_cart_txt(totals):
+    for name, measurement_unit, total in totals:
+        yield f'{name} ({measurement_unit}): {total}\n'
+
+
+def shopping_cart_csv(totals):
+    writer = csv.writer(Echo())
+    yield writer.writerow(SHOPPING_CART_CSV_HEADER)
+    for row in totals:
+        yield writer.writerow(row)
+
+
+def shopping_cart_json(totals):
+    separator = '['
+    for name, measurement_unit, total in totals:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': total
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+SHOPPING_CART_WRITERS = {
+    'txt': shopping_cart_txt,
+    'csv': shopping_cart_csv,
+    'json': shopping_cart_json,
+}
+
+
+def shopping_cart_data_creator(user, file_format='txt'):
+    return SHOPPING_CART_WRITERS[file_format](
+        shopping_cart_totals(user).iterator()
+    )
@@ -1,6 +1,10 @@
-from api.filters import NameFilter, RecipeFilter
-from api.paginations import LargeResultsSetPagination
+from api.caches import tag_catalogue
+from api.connections import connection_monitor
+from api.filters import NameFilter, RecipeFilter, RecipeSearchFilter
+from api.indexes import ingredient_index
+from api.paginations import PageOrCursorPagination
 from api.permissions import AuthorOrReadOnly
+from api.renderers import CSVRenderer, PlainTextRenderer
 from api.serializers import (DjoserUserCreateSerializer, DjoserUserSerializer,
                              IngredientNameSerializer, RecipeCreateSerializer,
                              RecipeReadSerializer, ShoppingCartSerializer,
@@ -8,36 +12,65 @@ from api.serializers import (DjoserUserCreateSerializer, DjoserUserSerializer,
                              SubscriptionRecipeSerializer,
                              SubscriptionSerializer,
                              SubscriptionsGetSerializer, TagSerializer)
-from api.utils import shopping_cart_data_creator
+from api.utils import SHOPPING_CART_FILENAME, shopping_cart_data_creator
 from api_foodgram.settings import DELETE_SUCCESS
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
+from recipes import feed as timeline
 from recipes.models import (Favorite, IngredientName, Recipe, ShoppingCart,
                             Subscription, Tag, User)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
 
 class DjoserUserViewSet(UserViewSet):
-    pagination_class = LargeResultsSetPagination
+    pagination_class = PageOrCursorPagination
     permission_classes = [IsAuthenticated, ]
 
     def get_queryset(self):
         if self.action not in ('subscriptions', 'subscribe'):
-            return User.objects.all()
-        user = get_object_or_404(
-            User,
-            id=self.request.user.pk
+            return User.objects.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=OuterRef('pk'),
+                        author=self.request.user.pk
+                    )
+                )
+            )
+        return User.objects.filter(
+            subscription_from_user__author=self.request.user.pk
+        ).annotate(
+            subscription_id=F('subscription_from_user__id'),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('-subscription_id')
+
+    def get_subscriptions(self, recipes_limit=None):
+        recipes = Recipe.objects.order_by('-id')
+        if recipes_limit:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('author')
+                    ).order_by('-id').values('id')[:recipes_limit]
+                )
+            )
+        return self.get_queryset().prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
         )
-        return [
-            sub.user for sub in user.subscription_from_author.all()
-        ]
 
     def get_serializer_class(self):
         is_custom_action = self.action in ('subscriptions', 'subscribe', 'me')
@@ -61,7 +94,7 @@ class DjoserUserViewSet(UserViewSet):
         if self.request.method == "POST":
             Subscription.objects.create(**serializer.validated_data)
             serializer = SubscriptionSerializer(
-                self.get_queryset(),
+                self.get_subscriptions(),
                 context={"request": request},
                 many=True
             )
@@ -94,7 +127,7 @@ class DjoserUserViewSet(UserViewSet):
         recipes_limit = serializer.validated_data.get('recipes_limit')
         if recipes_limit:
             context['recipes_limit'] = recipes_limit
-        pages = self.paginate_queryset(self.get_queryset())
+        pages = self.paginate_queryset(self.get_subscriptions(recipes_limit))
         input_serializer = SubscriptionSerializer(
             pages,
             context=context,
@@ -108,7 +141,7 @@ class DjoserUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated, ]
     )
     def me(self, request):
-        user = get_object_or_404(User, username=request.user.username)
+        user = get_object_or_404(self.get_queryset(), pk=request.user.pk)
         serializer = self.get_serializer(user, context={"request": request})
         return Response(serializer.data)
 
@@ -121,20 +154,62 @@ class TagViewSet(
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def catalogue_response(self, request, data, etag):
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        catalogue = tag_catalogue.get()
+        return self.catalogue_response(
+            request,
+            catalogue['tags'],
+            catalogue['etag']
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        catalogue = tag_catalogue.get()
+        for tag in catalogue['tags']:
+            if str(tag['id']) == kwargs[self.lookup_field]:
+                return self.catalogue_response(
+                    request,
+                    tag,
+                    catalogue['etag']
+                )
+        raise Http404
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.prefetch_related(
-        'tags',
-        'ingredients'
-    ).select_related(
-        'author'
-    ).all()
-    pagination_class = LargeResultsSetPagination
-    filter_backends = (DjangoFilterBackend,)
+    queryset = Recipe.objects.select_related('author').all()
+    pagination_class = PageOrCursorPagination
+    filter_backends = (DjangoFilterBackend, OrderingFilter, RecipeSearchFilter)
     filterset_class = RecipeFilter
     filterset_fields = ('tags', 'author')
+    ordering_fields = ('id', 'favorites_count', 'cart_count')
+    ordering = ('-id',)
     permission_classes = (AuthorOrReadOnly,)
 
+    def get_queryset(self):
+        user_id = self.request.user.id
+        return super().get_queryset().annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(
+                    author=user_id,
+                    recipe=OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    author=user_id,
+                    recipe=OuterRef('pk')
+                )
+            )
+        )
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
@@ -180,15 +255,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
         detail=False
     )
+    def feed(self, request):
+        recipes = timeline.feed(self.get_queryset(), request.user.id)
+        page = self.paginate_queryset(recipes)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['get'],
+        detail=True
+    )
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe=recipe
+        ).annotate(
+            similarity=F('similar_to__score')
+        ).order_by('-similarity', '-id')
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
+        detail=False
+    )
     def download_shopping_cart(self, request):
-        return HttpResponse(
-            shopping_cart_data_creator(request.user),
-            headers={
-                'Content-Type': 'text/plain',
-                'Content-Disposition':
-                    'attachment; filename="shopping_list.txt"',
-            }
-        )
+        renderer = request.accepted_renderer
+        filename = SHOPPING_CART_FILENAME.format(format=renderer.format)
+        content = shopping_cart_data_creator(request.user, renderer.format)
+        headers = {
+            'Content-Type': f'{renderer.media_type}; charset=utf-8',
+            'Content-Disposition': f'attachment; filename="{filename}"',
+        }
+        if isinstance(request._request, ASGIRequest):
+            # Django 3.2 перебирает потоковый ответ прямо в цикле событий,
+            # где ORM недоступен, поэтому под ASGI файл собирается здесь,
+            # в потоке запроса. Строк в нём не больше, чем ингредиентов.
+            return HttpResponse(''.join(content), headers=headers)
+        return StreamingHttpResponse(content, headers=headers)
 
     @action(
         methods=('POST', 'DELETE'),
@@ -223,3 +329,21 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = NameFilter
     filterset_fields = ('name', )
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            ingredients = ingredient_index.search(name)
+        else:
+            ingredients = ingredient_index.all()
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
+
+class DatabaseStatsView(APIView):
+    """Статистика соединений с БД текущего процесса."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(connection_monitor.stats())
@@ -1,7 +1,25 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import ThreadSensitiveContext
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_foodgram.settings')
 
-application = get_asgi_application()
+
+class ThreadPerRequestASGIHandler(ASGIHandler):
+    """ASGI-обработчик, выполняющий синхронный код запроса в своём потоке.
+
+    Django 3.2 выполняет все синхронные представления (а DRF других не
+    поддерживает) в одном общем потоке процесса, поэтому медленный
+    запрос задерживает все остальные. ThreadSensitiveContext даёт
+    каждому запросу отдельный поток, как это делает Django 4.0.
+    """
+
+    async def __call__(self, scope, receive, send):
+        async with ThreadSensitiveContext():
+            await super().__call__(scope, receive, send)
+
+
+django.setup(set_prefix=False)
+application = ThreadPerRequestASGIHandler()
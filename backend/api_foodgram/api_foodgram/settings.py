@@ -34,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -62,6 +63,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_foodgram.wsgi.application'
 
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+
+# Постоянные соединения включаются явно через DB_CONN_MAX_AGE. Под
+# ASGI у каждого запроса свой поток, и соединение, оставленное
+# открытым, больше никогда не переиспользуется, поэтому там
+# постоянные соединения отключены.
+DB_CONN_MAX_AGE = (
+    0 if SERVER_MODE == 'asgi'
+    else int(os.getenv('DB_CONN_MAX_AGE', default=0))
+)
+DB_CONN_HEALTH_CHECK_AFTER = int(
+    os.getenv('DB_CONN_HEALTH_CHECK_AFTER', default=10)
+)
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
@@ -69,10 +84,34 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
     }
 }
 
+# Реплики для чтения через запятую: хосты PostgreSQL, а для SQLite,
+# чтобы проверить маршрутизацию локально, — файлы БД.
+DB_REPLICAS = [
+    replica for replica in os.getenv('DB_REPLICAS', default='').split(',')
+    if replica
+]
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', default=5))
+
+
+def replica_databases(primary, replicas):
+    field = 'NAME' if primary['ENGINE'].endswith('sqlite3') else 'HOST'
+    return {
+        f'replica_{number}': {**primary, field: replica}
+        for number, replica in enumerate(replicas, start=1)
+    }
+
+
+DATABASES.update(replica_databases(DATABASES['default'], DB_REPLICAS))
+DB_REPLICA_ALIASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = (
+    ['api.routers.PrimaryReplicaRouter'] if DB_REPLICA_ALIASES else []
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -106,10 +145,17 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+BASIC_AUTH_ENABLED = os.getenv('BASIC_AUTH_ENABLED', default='False') == 'True'
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+        *(
+            ['rest_framework.authentication.BasicAuthentication']
+            if BASIC_AUTH_ENABLED else []
+        ),
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -117,6 +163,49 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'recipes.User'
 
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=(
+                os.path.join(BASE_DIR, 'cache')
+                if CACHE_BACKEND == 'file' else 'foodgram'
+            )
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=10000)),
+        },
+    }
+}
+RECIPE_FRAGMENT_TIMEOUT = int(
+    os.getenv('RECIPE_FRAGMENT_TIMEOUT', default=300)
+)
+TAG_CATALOGUE_TIMEOUT = int(os.getenv('TAG_CATALOGUE_TIMEOUT', default=300))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', default=50))
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', default='russian')
+
+FEED_FAN_OUT_MAX_RECIPES = int(
+    os.getenv('FEED_FAN_OUT_MAX_RECIPES', default=500)
+)
+
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', default=10))
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+IMAGE_RENDITION_FORMAT = 'WEBP'
+IMAGE_RENDITIONS = {
+    'thumbnail': (320, 320),
+    'medium': (800, 800),
+}
+
 ID_NOT_FOUND = 'Не найден {name} с таким id'
 ALREADY_CREATED = 'У вас уже есть {name} с таким названием'
 COOKING_TIME_LIMIT = 'Введите время приготовления от 1 до 1000'
@@ -0,0 +1,11 @@
+import os
+
+import django
+from django.core.management import call_command
+
+
+def setup_django():
+    """Поднимает проект на SQLite, чтобы замеры не трогали рабочую БД."""
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    django.setup()
+    call_command('migrate', verbosity=0, interactive=False)
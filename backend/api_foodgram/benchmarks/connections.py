@@ -0,0 +1,113 @@
+"""Задержка запроса с постоянными соединениями с БД и без них.
+
+Один клиент по очереди вызывает небольшие эндпоинты у gunicorn с
+одним воркером — сначала с CONN_MAX_AGE=0, когда каждый запрос
+открывает своё соединение, затем с --max-age. Для каждого эндпоинта
+выводится медианная задержка, а в конце — статистика соединений из
+/api/db-stats/. Вместо PostgreSQL используется файл SQLite;
+--connect-latency добавляет к открытию соединения время установки
+TCP-соединения и аутентификации (см. benchmarks/latency.py).
+
+Запуск из каталога backend/api_foodgram:
+    python -m benchmarks.connections --connect-latency 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import requests
+from benchmarks import setup_django
+from benchmarks.load import gunicorn
+
+ENDPOINTS = (
+    ('tags-list', 'get', '/api/tags/'),
+    ('ingredients-search', 'get', '/api/ingredients/?name=ингр'),
+    ('recipes-detail', 'get', '/api/recipes/{recipe}/'),
+    ('favorite-add', 'post', '/api/recipes/{free_recipe}/favorite/'),
+    ('favorite-remove', 'delete', '/api/recipes/{free_recipe}/favorite/'),
+)
+
+
+def measure(base_url, session, urls, repeat):
+    latencies = {name: [] for name, _, _ in ENDPOINTS}
+    for _ in range(repeat + 1):
+        for name, method, url in ENDPOINTS:
+            started = time.perf_counter()
+            response = session.request(method, base_url + url.format(**urls))
+            latencies[name].append(time.perf_counter() - started)
+            response.raise_for_status()
+    # Первый проход прогревает кэши процесса.
+    return {
+        name: statistics.median(values[1:])
+        for name, values in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dataset-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--max-age', type=int, default=60)
+    parser.add_argument(
+        '--connect-latency',
+        type=float,
+        default=0,
+        help='Задержка открытия соединения с БД в миллисекундах.'
+    )
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='foodgram-connections-')
+    database = os.path.join(directory, 'db.sqlite3')
+    os.environ['BENCHMARK_DB_NAME'] = database
+    setup_django()
+    from benchmarks.dataset import PASSWORD, seed
+    from recipes.models import User
+    from rest_framework.authtoken.models import Token
+
+    dataset = seed(args.dataset_size)
+    token = Token.objects.create(user=dataset.reader).key
+    admin = User.objects.create_superuser(
+        email='admin@example.com',
+        username='admin',
+        password=PASSWORD
+    )
+    admin_token = Token.objects.create(user=admin).key
+    urls = {'recipe': dataset.recipe_id, 'free_recipe': dataset.free_recipe_id}
+
+    print(
+        f'рецептов: {args.dataset_size}, повторов: {args.repeat}, '
+        f'открытие соединения: +{args.connect_latency:g} мс'
+    )
+    results = {}
+    for max_age in (0, args.max_age):
+        server = gunicorn(
+            BENCHMARK_DB_NAME=database,
+            DB_CONN_MAX_AGE=str(max_age),
+            BENCHMARK_DB_CONNECT_LATENCY_MS=str(args.connect_latency)
+        )
+        with server as (_, base_url):
+            session = requests.Session()
+            session.headers['Authorization'] = f'Token {token}'
+            results[max_age] = measure(base_url, session, urls, args.repeat)
+            stats = requests.get(
+                base_url + '/api/db-stats/',
+                headers={'Authorization': f'Token {admin_token}'}
+            ).json()['default']
+        print(
+            f'CONN_MAX_AGE={max_age}: открыто соединений {stats["opened"]}, '
+            f'переиспользовано {stats["reused"]}, '
+            f'проверено {stats["checked"]}'
+        )
+    print(f'{"эндпоинт":<22}{"без":>10}{"с":>10}  (медиана, мс)')
+    for name, _, _ in ENDPOINTS:
+        print(
+            f'{name:<22}'
+            f'{results[0][name] * 1000:10.2f}'
+            f'{results[args.max_age][name] * 1000:10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
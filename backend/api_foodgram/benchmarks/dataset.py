@@ -0,0 +1,120 @@
+"""Синтетический набор данных для замеров.
+
+Все строки вставляются через bulk_create, поэтому набор на десятки
+тысяч рецептов создаётся за секунды.
+"""
+import io
+import random
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from recipes.models import (Favorite, IngredientName, Recipe, RecipeIngredient,
+                            ShoppingCart, Subscription, Tag, User)
+
+PASSWORD = 'benchmark-password'
+INGREDIENTS_PER_RECIPE = 8
+AMOUNTS = (10, 50, 100)
+TAGS_PER_RECIPE = 2
+CART_SIZE = 20
+MIN_RECIPES = CART_SIZE * 2
+TAG_SLUGS = ('breakfast', 'lunch', 'dinner', 'dessert', 'snack')
+
+
+def seed(recipes_count, seed_value=0):
+    """Создаёт recipes_count рецептов и всё, что на них ссылается.
+
+    Возвращает пространство имён с идентификаторами, которые нужны
+    замерам: основной пользователь, автор, рецепт и слаги тэгов.
+    """
+    rng = random.Random(seed_value)
+    recipes_count = max(recipes_count, MIN_RECIPES)
+    authors_count = max(10, recipes_count // 10)
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(
+            email=f'user{number}@example.com',
+            username=f'user{number}',
+            first_name='Имя',
+            last_name='Фамилия',
+            password=password
+        )
+        for number in range(authors_count + 1)
+    )
+    users = list(User.objects.order_by('id'))
+    reader, authors = users[0], users[1:]
+
+    Tag.objects.bulk_create(
+        Tag(name=slug, color='#49B64E', slug=slug) for slug in TAG_SLUGS
+    )
+    tags = list(Tag.objects.all())
+    IngredientName.objects.bulk_create(
+        IngredientName(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(max(100, recipes_count // 5))
+    )
+    names = list(
+        IngredientName.objects.order_by('id').values_list('id', flat=True)
+    )
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}',
+                image='recipes/benchmark.png',
+                text='Описание рецепта ' * 20,
+                cooking_time=rng.randint(1, 120)
+            )
+            for number in range(recipes_count)
+        ),
+        batch_size=1000
+    )
+    recipes = list(
+        Recipe.objects.order_by('id').values_list('id', flat=True)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+            for recipe_id in recipes
+            for tag in rng.sample(tags, TAGS_PER_RECIPE)
+        ),
+        batch_size=1000
+    )
+    RecipeIngredient.objects.bulk_create(
+        (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_name_id=name_id,
+                amount=rng.choice(AMOUNTS)
+            )
+            for recipe_id in recipes
+            for name_id in rng.sample(names, INGREDIENTS_PER_RECIPE)
+        ),
+        batch_size=1000
+    )
+
+    Favorite.objects.bulk_create(
+        Favorite(author=reader, recipe_id=recipe_id)
+        for recipe_id in recipes[::4]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(author=reader, recipe_id=recipe_id)
+        for recipe_id in recipes[:CART_SIZE]
+    )
+    Subscription.objects.bulk_create(
+        Subscription(author=reader, user=author) for author in authors[1:]
+    )
+    call_command('reconcile_counters', stdout=io.StringIO())
+    call_command('reconcile_cart_totals', stdout=io.StringIO())
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    call_command('rebuild_feed', stdout=io.StringIO())
+    call_command('build_similarity', stdout=io.StringIO())
+    return SimpleNamespace(
+        reader=reader,
+        author=authors[0],
+        followed_author=authors[1],
+        recipe_id=recipes[0],
+        free_recipe_id=recipes[CART_SIZE + 1],
+        tag_ids=[tag.id for tag in tags],
+        tag_slugs=list(TAG_SLUGS),
+        ingredient_name_ids=names,
+    )
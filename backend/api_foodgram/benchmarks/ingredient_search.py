@@ -0,0 +1,69 @@
+"""Сравнение поиска ингредиентов через ORM и через индекс в памяти.
+
+Запуск из каталога backend/api_foodgram:
+    python -m benchmarks.ingredient_search
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+
+def measure(search, queries, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - started) / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fixture', default='ingredient.json')
+    args = parser.parse_args()
+
+    setup_django()
+    from api.filters import NameFilter
+    from api.indexes import ingredient_index
+    from django.core.management import call_command
+    from recipes.models import IngredientName
+
+    call_command('loaddata', args.fixture, verbosity=0)
+    names = IngredientName.objects.values_list('name', flat=True)
+    queries = sorted({
+        name[:length].lower()
+        for name in names
+        for length in (1, 2, 3)
+    })
+    total = IngredientName.objects.count()
+
+    def orm_search(query):
+        return list(NameFilter(
+            {'name': query},
+            queryset=IngredientName.objects.all()
+        ).qs)
+
+    def index_prefix(query):
+        return ingredient_index.prefix(query, limit=total)
+
+    index_prefix(queries[0])
+    results = (
+        ('ORM (istartswith)', measure(orm_search, queries, args.repeat)),
+        ('индекс, префикс', measure(index_prefix, queries, args.repeat)),
+        (
+            'индекс, префикс + подстрока',
+            measure(ingredient_index.search, queries, args.repeat)
+        ),
+    )
+    print(f'ингредиентов: {total}, запросов: {len(queries)}')
+    orm = results[0][1]
+    for title, seconds in results:
+        print(
+            f'{title:<30}{seconds * 1e6:10.1f} мкс/запрос'
+            f'  x{orm / seconds:.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
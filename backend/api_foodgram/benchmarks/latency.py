@@ -0,0 +1,24 @@
+"""Искусственные задержки соединения с БД.
+
+SQLite отвечает из памяти процесса, а рабочая PostgreSQL — по сети.
+BENCHMARK_DB_LATENCY_MS добавляет к каждому запросу сетевую задержку,
+BENCHMARK_DB_CONNECT_LATENCY_MS — к открытию соединения (TCP и
+аутентификация). Поток при этом спит и не держит GIL, как при
+ожидании ответа настоящей БД.
+"""
+import time
+
+from django.conf import settings
+
+
+def delay(execute, sql, params, many, context):
+    time.sleep(settings.BENCHMARK_DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_latency(connection, **kwargs):
+    time.sleep(settings.BENCHMARK_DB_CONNECT_LATENCY)
+    # Объект соединения потока переживает переподключения.
+    wrappers = connection.execute_wrappers
+    if settings.BENCHMARK_DB_LATENCY and delay not in wrappers:
+        wrappers.append(delay)
@@ -0,0 +1,214 @@
+"""Нагрузочное сравнение WSGI- и ASGI-режима gunicorn.
+
+Для каждого режима запускается gunicorn с gunicorn.conf.py на одном и
+том же наборе данных в файле SQLite, после чего concurrency клиентов
+в течение duration секунд по кругу запрашивают горячие эндпоинты
+чтения. Выводятся пропускная способность, задержки, число ошибок и
+память (RSS) мастера и воркеров gunicorn. Нужен Linux: память
+читается из /proc.
+
+На SQLite запросы упираются только в процессор, и ожидания, ради
+которого нужен ASGI, нет. --db-latency добавляет к каждому запросу
+сервера к БД сетевую задержку (см. benchmarks/latency.py).
+
+Запуск из каталога backend/api_foodgram:
+    python -m benchmarks.load --dataset-size 5000 --concurrency 50 \
+        --db-latency 2
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+from benchmarks import setup_django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+URLS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe}/',
+    '/api/ingredients/?name=ингр',
+    '/api/tags/',
+    '/api/recipes/download_shopping_cart/',
+)
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn завершился при запуске')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn не начал принимать соединения')
+
+
+def rss_kb(pid):
+    """Суммарный RSS процесса и всех его потомков в килобайтах."""
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f'/proc/{current}/status') as stream:
+                for line in stream:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children') as stream:
+                pids.extend(int(child) for child in stream.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def client(base_url, urls, token, deadline, results):
+    session = requests.Session()
+    session.headers['Authorization'] = f'Token {token}'
+    latencies, errors = [], 0
+    number = 0
+    while time.monotonic() < deadline:
+        url = urls[number % len(urls)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + url, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    results.append((latencies, errors))
+
+
+@contextmanager
+def gunicorn(**env):
+    """Запускает gunicorn на наборе benchmarks.settings, отдаёт его адрес."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=BASE_DIR,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            **env,
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port, process)
+        yield process, f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_mode(mode, args, database, urls, token):
+    server = gunicorn(
+        BENCHMARK_DB_NAME=database,
+        SERVER_MODE=mode,
+        GUNICORN_WORKERS=str(args.workers),
+        BENCHMARK_DB_LATENCY_MS=str(args.db_latency)
+    )
+    with server as (process, base_url):
+        for url in urls:
+            requests.get(
+                base_url + url,
+                headers={'Authorization': f'Token {token}'}
+            ).raise_for_status()
+        results = []
+        peak_rss = 0
+        deadline = time.monotonic() + args.duration
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            for _ in range(args.concurrency):
+                executor.submit(
+                    client, base_url, urls, token, deadline, results
+                )
+            while time.monotonic() < deadline:
+                peak_rss = max(peak_rss, rss_kb(process.pid))
+                time.sleep(0.5)
+    latencies = sorted(
+        latency for client_latencies, _ in results
+        for latency in client_latencies
+    )
+    errors = sum(client_errors for _, client_errors in results)
+    return latencies, errors, peak_rss
+
+
+def percentile(latencies, share):
+    if not latencies:
+        return float('nan')
+    return latencies[min(len(latencies) - 1, int(len(latencies) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dataset-size', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument(
+        '--db-latency',
+        type=float,
+        default=0,
+        help='Задержка каждого запроса к БД в миллисекундах.'
+    )
+    parser.add_argument(
+        '--modes',
+        nargs='+',
+        default=('wsgi', 'asgi'),
+        choices=('wsgi', 'asgi')
+    )
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='foodgram-load-')
+    database = os.path.join(directory, 'db.sqlite3')
+    os.environ['BENCHMARK_DB_NAME'] = database
+    setup_django()
+    from benchmarks.dataset import seed
+    from rest_framework.authtoken.models import Token
+
+    dataset = seed(args.dataset_size)
+    token = Token.objects.create(user=dataset.reader).key
+    urls = [url.format(recipe=dataset.recipe_id) for url in URLS]
+
+    print(
+        f'рецептов: {args.dataset_size}, клиентов: {args.concurrency}, '
+        f'воркеров: {args.workers}, задержка БД: {args.db_latency:g} мс, '
+        f'{args.duration:g} с на режим'
+    )
+    for mode in args.modes:
+        latencies, errors, peak_rss = run_mode(
+            mode, args, database, urls, token
+        )
+        print(
+            f'{mode}: {len(latencies) / args.duration:8.1f} запр/с'
+            f'  p50 {percentile(latencies, 0.5) * 1000:7.1f} мс'
+            f'  p99 {percentile(latencies, 0.99) * 1000:7.1f} мс'
+            f'  ср. {statistics.mean(latencies or [0]) * 1000:7.1f} мс'
+            f'  ошибок {errors:<5} RSS {peak_rss / 1024:6.1f} МБ'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Проверка маршрутизации чтений на реплику на двух файлах SQLite.
+
+Основная БД засевается набором данных, после чего её файл копируется
+в реплику. Репликации между файлами нет, поэтому реплика — застывший
+снимок, и по ответам видно, откуда читал запрос, пока скрипт не
+скопирует в неё основную БД через sqlite3 backup. Сервер запускается
+с двумя воркерами и файловым кэшем, чтобы закрепление за основной БД
+проверялось и между воркерами.
+
+Запуск из каталога backend/api_foodgram:
+    python -m benchmarks.replicas
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import requests
+from benchmarks import setup_django
+from benchmarks.load import gunicorn
+
+CHECK_REPEAT = 6
+
+
+def check(title, passed):
+    print(f'{"ok  " if passed else "FAIL"} {title}')
+    return passed
+
+
+def is_favorited(session, base_url, recipe_id):
+    return [
+        session.get(f'{base_url}/api/recipes/{recipe_id}/').json()[
+            'is_favorited'
+        ]
+        for _ in range(CHECK_REPEAT)
+    ]
+
+
+def replicate(primary, replica):
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+def author_name(base_url, recipe_id):
+    recipe = requests.get(f'{base_url}/api/recipes/{recipe_id}/').json()
+    return recipe['author']['first_name']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pin-seconds', type=int, default=2)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='foodgram-replicas-')
+    primary = os.path.join(directory, 'primary.sqlite3')
+    replica = os.path.join(directory, 'replica.sqlite3')
+    # Сервер наследует окружение, а этот процесс пишет в основную БД
+    # и сбрасывает тот же файловый кэш, что и сервер.
+    os.environ.update(
+        BENCHMARK_DB_NAME=primary,
+        DB_REPLICAS=replica,
+        DB_REPLICA_PIN_SECONDS=str(args.pin_seconds),
+        CACHE_BACKEND='file',
+        CACHE_LOCATION=os.path.join(directory, 'cache')
+    )
+    setup_django()
+    from benchmarks.dataset import PASSWORD, seed
+    from django.db import connections
+    from rest_framework.authtoken.models import Token
+
+    dataset = seed(100)
+    token = Token.objects.create(user=dataset.reader).key
+    connections.close_all()
+    replicate(primary, replica)
+
+    server = gunicorn(GUNICORN_WORKERS='2')
+    recipe_id = dataset.free_recipe_id
+    results = []
+    with server as (_, base_url):
+        session = requests.Session()
+        session.headers['Authorization'] = f'Token {token}'
+        results.append(check(
+            'до записи рецепт не в избранном',
+            not any(is_favorited(session, base_url, recipe_id))
+        ))
+        session.post(
+            f'{base_url}/api/recipes/{recipe_id}/favorite/'
+        ).raise_for_status()
+        results.append(check(
+            'сразу после записи чтения идут в основную БД',
+            all(is_favorited(session, base_url, recipe_id))
+        ))
+        time.sleep(args.pin_seconds + 1)
+        results.append(check(
+            'после окна закрепления чтения идут в реплику',
+            not any(is_favorited(session, base_url, recipe_id))
+        ))
+        author_name(base_url, dataset.recipe_id)
+        dataset.author.first_name = 'Новое имя'
+        dataset.author.save()
+        stale = [
+            author_name(base_url, dataset.recipe_id)
+            for _ in range(CHECK_REPEAT)
+        ]
+        replicate(primary, replica)
+        results.append(check(
+            'фрагмент, прочитанный с отстающей реплики, не закэширован',
+            'Новое имя' not in stale
+            and author_name(base_url, dataset.recipe_id) == 'Новое имя'
+        ))
+        login = requests.post(
+            f'{base_url}/api/auth/token/login/',
+            json={'email': dataset.author.email, 'password': PASSWORD}
+        )
+        login.raise_for_status()
+        me = requests.get(
+            f'{base_url}/api/users/me/',
+            headers={
+                'Authorization': f'Token {login.json()["auth_token"]}'
+            }
+        )
+        results.append(check(
+            'новый токен принимается, хотя в реплике его ещё нет',
+            me.status_code == 200
+        ))
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from api_foodgram.settings import *  # noqa: F401, F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('BENCHMARK_DB_NAME', default=':memory:'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,  # noqa: F405
+    }
+}
+DATABASES.update(
+    replica_databases(DATABASES['default'], DB_REPLICAS)  # noqa: F405
+)
+DB_REPLICA_ALIASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = (
+    ['api.routers.PrimaryReplicaRouter'] if DB_REPLICA_ALIASES else []
+)
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-benchmarks-')
+
+BENCHMARK_DB_LATENCY = float(
+    os.getenv('BENCHMARK_DB_LATENCY_MS', default=0)
+) / 1000
+BENCHMARK_DB_CONNECT_LATENCY = float(
+    os.getenv('BENCHMARK_DB_CONNECT_LATENCY_MS', default=0)
+) / 1000
+if BENCHMARK_DB_LATENCY or BENCHMARK_DB_CONNECT_LATENCY:
+    from benchmarks.latency import add_latency
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(add_latency)
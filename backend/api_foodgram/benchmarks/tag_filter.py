@@ -0,0 +1,65 @@
+"""Сравнение фильтра по тэгам через JOIN + DISTINCT и через EXISTS.
+
+Для каждого варианта замеряется то, что делает пагинатор: COUNT(*)
+и первая страница ленты.
+
+Запуск из каталога backend/api_foodgram:
+    python -m benchmarks.tag_filter --dataset-size 50000
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+PAGE_SIZE = 6
+
+
+def measure(queryset, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count = queryset.count()
+        list(queryset.order_by('-id')[:PAGE_SIZE])
+    return (time.perf_counter() - started) / repeat, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dataset-size', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from api.filters import RecipeFilter
+    from benchmarks.dataset import seed
+    from recipes.models import Recipe
+
+    dataset = seed(args.dataset_size)
+    slugs = dataset.tag_slugs[:2]
+
+    def tags_filter(**params):
+        return RecipeFilter(
+            {'tags': slugs, **params},
+            queryset=Recipe.objects.all()
+        ).qs
+
+    variants = (
+        (
+            'JOIN + DISTINCT, любой',
+            Recipe.objects.filter(tags__slug__in=slugs).distinct()
+        ),
+        ('EXISTS, любой', tags_filter()),
+        ('EXISTS, все', tags_filter(tags_match='all')),
+    )
+    print(f'рецептов: {Recipe.objects.count()}, тэги: {", ".join(slugs)}')
+    baseline = None
+    for title, queryset in variants:
+        seconds, count = measure(queryset, args.repeat)
+        baseline = baseline or seconds
+        print(
+            f'{title:<26}{seconds * 1000:10.1f} мс'
+            f'  строк: {count:<8}x{baseline / seconds:.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Суммы ShoppingCartTotal совпадают с пересчётом по корзинам."""
+import pytest
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingCartTotal
+
+pytestmark = pytest.mark.django_db
+
+
+def recomputed():
+    ingredients = {}
+    for recipe_id, name_id, amount in RecipeIngredient.objects.values_list(
+            'recipe',
+            'ingredient_name',
+            'amount'
+    ):
+        ingredients.setdefault(recipe_id, []).append((name_id, amount))
+    totals = {}
+    for author_id, recipe_id in ShoppingCart.objects.values_list(
+            'author',
+            'recipe'
+    ):
+        for name_id, amount in ingredients.get(recipe_id, ()):
+            total, recipes = totals.get((author_id, name_id), (0, 0))
+            totals[author_id, name_id] = (total + amount, recipes + 1)
+    return totals
+
+
+def assert_totals_match():
+    stored = {
+        (author_id, name_id): (amount, recipes)
+        for author_id, name_id, amount, recipes in (
+            ShoppingCartTotal.objects.values_list(
+                'author',
+                'ingredient_name',
+                'amount',
+                'recipes'
+            )
+        )
+    }
+    assert stored == recomputed()
+
+
+def cart(client, recipe_id, method='post'):
+    response = getattr(client, method)(
+        f'/api/recipes/{recipe_id}/shopping_cart/'
+    )
+    assert response.status_code == (201 if method == 'post' else 204)
+
+
+def test_cart_add_and_remove(dataset, reader_client):
+    assert_totals_match()
+    cart(reader_client, dataset.free_recipe_id)
+    assert_totals_match()
+    cart(reader_client, dataset.recipe_id, 'delete')
+    assert_totals_match()
+    cart(reader_client, dataset.free_recipe_id, 'delete')
+    assert_totals_match()
+
+
+def test_carted_recipe_ingredients_change(dataset, author_client):
+    # Рецепт уже лежит в корзине читателя, теперь и в корзине автора.
+    cart(author_client, dataset.recipe_id)
+    current = dict(
+        RecipeIngredient.objects.filter(
+            recipe=dataset.recipe_id
+        ).values_list('ingredient_name', 'amount')
+    )
+    # Часть ингредиентов меняет количество, часть удаляется,
+    # и добавляются новые.
+    kept = sorted(current)[:4]
+    added = [
+        name_id for name_id in dataset.ingredient_name_ids
+        if name_id not in current
+    ][:3]
+    response = author_client.patch(
+        f'/api/recipes/{dataset.recipe_id}/',
+        {
+            'ingredients': [
+                {'id': name_id, 'amount': current[name_id] + 7}
+                for name_id in kept
+            ] + [{'id': name_id, 'amount': 25} for name_id in added],
+        },
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    assert_totals_match()
+
+
+def test_carted_recipe_delete(dataset, author_client):
+    cart(author_client, dataset.recipe_id)
+    response = author_client.delete(f'/api/recipes/{dataset.recipe_id}/')
+    assert response.status_code == 204
+    assert not ShoppingCart.objects.filter(recipe=dataset.recipe_id).exists()
+    assert_totals_match()
@@ -0,0 +1,473 @@
+"""Бюджет запросов к БД и задержки для каждого эндпоинта API.
+
+Запуск из каталога backend/api_foodgram:
+    pytest --dataset-size 5000 --benchmark-report report.json
+
+Бюджеты хранятся в benchmarks/budgets.json. Число запросов не должно
+зависеть от размера набора данных, поэтому превышение бюджета почти
+всегда означает появившийся N+1. Первый запрос выполняется с пустыми
+кэшами и сверяется с бюджетом cold_queries, повторные — с queries.
+
+Задержка только записывается в отчёт: на общих машинах CI она
+слишком шумная. Чтобы проверять и её бюджет, задайте
+BENCHMARK_CHECK_LATENCY=1.
+"""
+import base64
+import io
+import os
+import statistics
+import time
+
+import pytest
+from api.authentication import token_cache
+from api.indexes import ingredient_index
+from benchmarks.dataset import PASSWORD
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+pytestmark = pytest.mark.django_db
+
+CHECK_LATENCY = os.getenv('BENCHMARK_CHECK_LATENCY', default='0') == '1'
+NEW_PASSWORD = 'benchmark-password-2'
+
+
+def png_base64():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), '#49B64E').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+def recipe_payload(urls, iteration):
+    return {
+        'name': f'Новый рецепт {iteration}',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': png_base64(),
+        'tags': urls['tag_ids'][:2],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10 + number}
+            for number, ingredient_id in enumerate(
+                urls['ingredient_name_ids'][:10]
+            )
+        ],
+    }
+
+
+def user_payload(urls, iteration):
+    return {
+        'email': f'new{iteration}@example.com',
+        'username': f'new{iteration}',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': urls['password'],
+    }
+
+
+def password_payload(urls, iteration):
+    """Пароль меняется туда и обратно на чётных и нечётных повторах."""
+    passwords = (urls['password'], NEW_PASSWORD)
+    return {
+        'current_password': passwords[iteration % 2],
+        'new_password': passwords[(iteration + 1) % 2],
+    }
+
+
+def forget_tokens(client, urls, iteration):
+    """Сбрасывает кэш токенов, как после фиксации смены пароля.
+
+    Транзакция замера не фиксируется, и сигнал не убирает из кэша
+    пользователя со старым паролем.
+    """
+    token_cache.clear()
+    return {}
+
+
+def log_in(client, urls, iteration):
+    """Выдаёт клиенту новый токен взамен удалённого при выходе."""
+    response = client.post(
+        '/api/auth/token/login/',
+        {'email': urls['reader_email'], 'password': urls['password']},
+        format='json'
+    )
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+    )
+    return {}
+
+
+def create_recipe(client, urls, iteration):
+    response = client.post(
+        '/api/recipes/',
+        recipe_payload(urls, iteration),
+        format='json'
+    )
+    return {'created': response.data['id']}
+
+
+class Endpoint:
+    """Замеряемый запрос.
+
+    prepare(client, urls, iteration) выполняется перед каждым замером
+    вне подсчёта запросов и возвращает дополнительные значения для url,
+    undo отменяет сделанное запросом после замера.
+    """
+
+    def __init__(
+            self,
+            name,
+            method,
+            url,
+            client='reader',
+            status=200,
+            data=None,
+            undo=None,
+            prepare=None
+    ):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.client = client
+        self.status = status
+        self.data = data
+        self.undo = undo
+        self.prepare = prepare
+
+    def __repr__(self):
+        return self.name
+
+
+ENDPOINTS = (
+    Endpoint('tags-list', 'get', '/api/tags/', client='anonymous'),
+    Endpoint('tags-detail', 'get', '/api/tags/{tag_id}/', client='anonymous'),
+    Endpoint('ingredients-list', 'get', '/api/ingredients/'),
+    Endpoint('ingredients-search', 'get', '/api/ingredients/?name=ингр'),
+    Endpoint(
+        'ingredients-detail',
+        'get',
+        '/api/ingredients/{ingredient_name_id}/'
+    ),
+    Endpoint('recipes-list', 'get', '/api/recipes/'),
+    Endpoint(
+        'recipes-list-anonymous',
+        'get',
+        '/api/recipes/',
+        client='anonymous'
+    ),
+    Endpoint('recipes-list-limit-50', 'get', '/api/recipes/?limit=50'),
+    Endpoint('recipes-list-deep-page', 'get', '/api/recipes/?page=20'),
+    Endpoint(
+        'recipes-list-cursor',
+        'get',
+        '/api/recipes/?pagination=cursor&limit=50'
+    ),
+    Endpoint(
+        'recipes-filter-tags',
+        'get',
+        '/api/recipes/?tags={tag}&tags={other_tag}'
+    ),
+    Endpoint(
+        'recipes-filter-tags-all',
+        'get',
+        '/api/recipes/?tags={tag}&tags={other_tag}&tags_match=all'
+    ),
+    Endpoint('recipes-filter-author', 'get', '/api/recipes/?author={author}'),
+    Endpoint(
+        'recipes-filter-favorited',
+        'get',
+        '/api/recipes/?is_favorited=1'
+    ),
+    Endpoint(
+        'recipes-filter-shopping-cart',
+        'get',
+        '/api/recipes/?is_in_shopping_cart=1'
+    ),
+    Endpoint('recipes-search', 'get', '/api/recipes/?search=рецепт 123'),
+    Endpoint(
+        'recipes-search-common',
+        'get',
+        '/api/recipes/?search=описание'
+    ),
+    Endpoint('recipes-feed', 'get', '/api/recipes/feed/'),
+    Endpoint(
+        'recipes-feed-cursor',
+        'get',
+        '/api/recipes/feed/?pagination=cursor&limit=50'
+    ),
+    Endpoint('recipes-detail', 'get', '/api/recipes/{recipe}/'),
+    Endpoint('recipes-similar', 'get', '/api/recipes/{recipe}/similar/'),
+    Endpoint(
+        'recipes-create',
+        'post',
+        '/api/recipes/',
+        client='author',
+        status=201,
+        data=recipe_payload,
+        undo=('delete', '/api/recipes/{created}/')
+    ),
+    Endpoint(
+        'recipes-update',
+        'patch',
+        '/api/recipes/{recipe}/',
+        client='author',
+        data=recipe_payload
+    ),
+    Endpoint(
+        'recipes-update-name',
+        'patch',
+        '/api/recipes/{recipe}/',
+        client='author',
+        data=lambda urls, iteration: {'name': f'Новое название {iteration}'}
+    ),
+    Endpoint(
+        'recipes-delete',
+        'delete',
+        '/api/recipes/{created}/',
+        client='author',
+        status=204,
+        prepare=create_recipe
+    ),
+    Endpoint(
+        'favorite-add',
+        'post',
+        '/api/recipes/{free_recipe}/favorite/',
+        status=201,
+        undo=('delete', '/api/recipes/{free_recipe}/favorite/')
+    ),
+    Endpoint(
+        'favorite-remove',
+        'delete',
+        '/api/recipes/{recipe}/favorite/',
+        status=204,
+        undo=('post', '/api/recipes/{recipe}/favorite/')
+    ),
+    Endpoint(
+        'shopping-cart-add',
+        'post',
+        '/api/recipes/{free_recipe}/shopping_cart/',
+        status=201,
+        undo=('delete', '/api/recipes/{free_recipe}/shopping_cart/')
+    ),
+    Endpoint(
+        'shopping-cart-remove',
+        'delete',
+        '/api/recipes/{recipe}/shopping_cart/',
+        status=204,
+        undo=('post', '/api/recipes/{recipe}/shopping_cart/')
+    ),
+    Endpoint(
+        'shopping-cart-download-txt',
+        'get',
+        '/api/recipes/download_shopping_cart/'
+    ),
+    Endpoint(
+        'shopping-cart-download-csv',
+        'get',
+        '/api/recipes/download_shopping_cart/?format=csv'
+    ),
+    Endpoint(
+        'shopping-cart-download-json',
+        'get',
+        '/api/recipes/download_shopping_cart/?format=json'
+    ),
+    Endpoint('users-list', 'get', '/api/users/'),
+    Endpoint('users-detail', 'get', '/api/users/{author}/'),
+    Endpoint('users-me', 'get', '/api/users/me/'),
+    Endpoint(
+        'users-create',
+        'post',
+        '/api/users/',
+        client='anonymous',
+        status=201,
+        data=user_payload
+    ),
+    Endpoint(
+        'users-set-password',
+        'post',
+        '/api/users/set_password/',
+        status=204,
+        data=password_payload,
+        prepare=forget_tokens
+    ),
+    Endpoint(
+        'subscriptions',
+        'get',
+        '/api/users/subscriptions/?recipes_limit=3'
+    ),
+    Endpoint(
+        'subscriptions-cursor',
+        'get',
+        '/api/users/subscriptions/?recipes_limit=3&pagination=cursor'
+    ),
+    Endpoint(
+        'subscribe',
+        'post',
+        '/api/users/{author}/subscribe/',
+        status=201,
+        undo=('delete', '/api/users/{author}/subscribe/')
+    ),
+    Endpoint(
+        'unsubscribe',
+        'delete',
+        '/api/users/{followed}/subscribe/',
+        status=204,
+        undo=('post', '/api/users/{followed}/subscribe/')
+    ),
+    Endpoint('admin-recipes', 'get', '/admin/recipes/recipe/', client='admin'),
+    Endpoint(
+        'admin-recipes-search',
+        'get',
+        '/admin/recipes/recipe/?q=user1',
+        client='admin'
+    ),
+    Endpoint(
+        'admin-recipes-filter-tags',
+        'get',
+        '/admin/recipes/recipe/?tags__id__exact={tag_id}',
+        client='admin'
+    ),
+    Endpoint(
+        'admin-recipe-change',
+        'get',
+        '/admin/recipes/recipe/{recipe}/change/',
+        client='admin'
+    ),
+    Endpoint('admin-users', 'get', '/admin/recipes/user/', client='admin'),
+    Endpoint(
+        'admin-ingredient-names',
+        'get',
+        '/admin/recipes/ingredientname/',
+        client='admin'
+    ),
+    Endpoint(
+        'admin-favorites',
+        'get',
+        '/admin/recipes/favorite/',
+        client='admin'
+    ),
+    Endpoint(
+        'admin-subscriptions',
+        'get',
+        '/admin/recipes/subscription/',
+        client='admin'
+    ),
+    Endpoint('db-stats', 'get', '/api/db-stats/', client='admin'),
+    Endpoint(
+        'token-login',
+        'post',
+        '/api/auth/token/login/',
+        client='anonymous',
+        data=lambda urls, iteration: {
+            'email': urls['reader_email'],
+            'password': urls['password'],
+        }
+    ),
+    Endpoint(
+        'token-logout',
+        'post',
+        '/api/auth/token/logout/',
+        status=204,
+        prepare=log_in
+    ),
+)
+
+
+def url_values(dataset):
+    return {
+        'tag_id': dataset.tag_ids[0],
+        'tag_ids': dataset.tag_ids,
+        'tag': dataset.tag_slugs[0],
+        'other_tag': dataset.tag_slugs[1],
+        'author': dataset.author.id,
+        'followed': dataset.followed_author.id,
+        'recipe': dataset.recipe_id,
+        'free_recipe': dataset.free_recipe_id,
+        'ingredient_name_id': dataset.ingredient_name_ids[0],
+        'ingredient_name_ids': dataset.ingredient_name_ids,
+        'reader_email': dataset.reader.email,
+        'password': PASSWORD,
+    }
+
+
+def clear_caches():
+    cache.clear()
+    token_cache.clear()
+    ingredient_index.invalidate()
+
+
+def call(client, endpoint, urls, iteration):
+    data = endpoint.data(urls, iteration) if endpoint.data else None
+    if endpoint.prepare:
+        urls = {**urls, **endpoint.prepare(client, urls, iteration)}
+    request = getattr(client, endpoint.method)
+    url = endpoint.url.format(**urls)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = request(url, data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+    count = len(queries)
+    assert response.status_code == endpoint.status, response.content
+    if endpoint.undo:
+        undo_method, undo_url = endpoint.undo
+        created = response.data
+        if isinstance(created, dict):
+            created = created.get('id')
+        getattr(client, undo_method)(
+            undo_url.format(**{**urls, 'created': created})
+        )
+    return count, elapsed, url
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS, ids=repr)
+def test_endpoint_budget(
+        request,
+        dataset,
+        budgets,
+        benchmark_report,
+        endpoint
+):
+    assert endpoint.name in budgets, (
+        f'Для {endpoint.name} нет бюджета в benchmarks/budgets.json'
+    )
+    client = request.getfixturevalue(f'{endpoint.client}_client')
+    urls = url_values(dataset)
+    clear_caches()
+    cold_queries, _, url = call(client, endpoint, urls, 0)
+    repeat = request.config.getoption('--repeat')
+    runs = [
+        call(client, endpoint, urls, iteration)
+        for iteration in range(1, repeat + 1)
+    ]
+    queries = max(count for count, _, _ in runs)
+    latencies = sorted(elapsed * 1000 for _, elapsed, _ in runs)
+    median = statistics.median(latencies)
+    benchmark_report[endpoint.name] = {
+        'url': url,
+        'method': endpoint.method.upper(),
+        'queries': queries,
+        'cold_queries': cold_queries,
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'median': round(median, 3),
+            'max': round(latencies[-1], 3),
+        },
+        'budget': budgets[endpoint.name],
+    }
+    budget = budgets[endpoint.name]
+    assert queries <= budget['queries'], (
+        f'{endpoint.name}: {queries} запросов к БД, '
+        f'бюджет {budget["queries"]}'
+    )
+    assert cold_queries <= budget['cold_queries'], (
+        f'{endpoint.name}: {cold_queries} запросов к БД с пустыми кэшами, '
+        f'бюджет {budget["cold_queries"]}'
+    )
+    if CHECK_LATENCY:
+        assert median <= budget['latency_ms'], (
+            f'{endpoint.name}: медиана {median:.1f} мс, '
+            f'бюджет {budget["latency_ms"]} мс'
+        )
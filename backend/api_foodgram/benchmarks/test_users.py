@@ -0,0 +1,39 @@
+"""Сохранение пользователя не затирает денормализованные поля."""
+import pytest
+from benchmarks.dataset import PASSWORD
+from recipes.models import Recipe, User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_set_password_keeps_denormalized_fields(dataset, author_client):
+    author = dataset.author
+    # Токен попадает в кэш вместе с пользователем.
+    response = author_client.get('/api/users/me/')
+    assert response.status_code == 200
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f'Рецепт после входа {number}',
+            image='recipes/benchmark.png',
+            text='Описание',
+            cooking_time=10
+        )
+        for number in range(3)
+    )
+    User.objects.filter(pk=author.pk).update(
+        recipes_count=Recipe.objects.filter(author=author).count(),
+        feed_on_read=True
+    )
+    response = author_client.post(
+        '/api/users/set_password/',
+        {'current_password': PASSWORD, 'new_password': 'new-Passw0rd-42'},
+        format='json'
+    )
+    assert response.status_code == 204, response.content
+    author.refresh_from_db()
+    assert author.recipes_count == Recipe.objects.filter(
+        author=author
+    ).count()
+    assert author.feed_on_read
+    assert author.check_password('new-Passw0rd-42')
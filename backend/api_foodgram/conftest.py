@@ -0,0 +1,93 @@
+import json
+import platform
+from pathlib import Path
+
+import pytest
+from benchmarks.dataset import PASSWORD, seed
+from recipes.models import User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+BUDGETS_PATH = Path(__file__).resolve().parent / 'benchmarks' / 'budgets.json'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--dataset-size',
+        type=int,
+        default=500,
+        help='Количество рецептов в синтетическом наборе данных.'
+    )
+    group.addoption(
+        '--repeat',
+        type=int,
+        default=5,
+        help='Сколько раз повторять каждый запрос.'
+    )
+    group.addoption(
+        '--benchmark-report',
+        default='benchmark_report.json',
+        help='Куда записать JSON-отчёт.'
+    )
+
+
+@pytest.fixture(scope='session')
+def dataset(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        return seed(request.config.getoption('--dataset-size'))
+
+
+@pytest.fixture(scope='session')
+def budgets():
+    with open(BUDGETS_PATH, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+@pytest.fixture(scope='session')
+def benchmark_report(request):
+    results = {}
+    yield results
+    report = {
+        'dataset_size': request.config.getoption('--dataset-size'),
+        'repeat': request.config.getoption('--repeat'),
+        'python': platform.python_version(),
+        'endpoints': results,
+    }
+    path = request.config.getoption('--benchmark-report')
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, ensure_ascii=False, indent=4)
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+def token_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def reader_client(dataset):
+    return token_client(dataset.reader)
+
+
+@pytest.fixture
+def author_client(dataset):
+    return token_client(dataset.author)
+
+
+@pytest.fixture
+def admin_client(dataset):
+    admin = User.objects.create_superuser(
+        email='admin@example.com',
+        username='admin',
+        password=PASSWORD
+    )
+    client = APIClient()
+    client.force_login(admin)
+    return client
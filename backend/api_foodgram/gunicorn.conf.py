@@ -0,0 +1,17 @@
+"""Настройки gunicorn для WSGI- и ASGI-режима.
+
+SERVER_MODE=wsgi (по умолчанию) запускает синхронные воркеры,
+SERVER_MODE=asgi — воркеры uvicorn: медленный запрос (загрузка
+картинки, список покупок) занимает поток, а не весь воркер, поэтому
+воркер держит больше одновременных соединений.
+"""
+import os
+
+SERVER_MODES = {
+    'wsgi': ('api_foodgram.wsgi:application', 'sync'),
+    'asgi': ('api_foodgram.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+wsgi_app, worker_class = SERVER_MODES[os.getenv('SERVER_MODE', 'wsgi')]
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
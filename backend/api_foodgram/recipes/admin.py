@@ -1,42 +1,84 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import (Favorite, Ingredient, IngredientName, Recipe,
+from . import cart
+from .models import (Favorite, IngredientName, Recipe, RecipeIngredient,
                      ShoppingCart, Subscription, Tag, User)
 
 
 class CustomUserAdmin(UserAdmin):
-    search_fields = ('username', 'email', 'first_name')
-    list_filter = ('username', 'email', 'first_name')
+    search_fields = ('email', 'username', 'first_name', 'last_name')
+    list_filter = ('is_staff', 'is_active')
+    list_display = (
+        'email',
+        'username',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'is_staff'
+    )
+    show_full_result_count = False
+
+
+class TagAdmin(admin.ModelAdmin):
+    search_fields = ('name', 'slug')
+    list_display = ('name', 'color', 'slug')
+
+
+class IngredientNameAdmin(admin.ModelAdmin):
+    search_fields = ('name', )
+    list_display = ('name', 'measurement_unit')
+    show_full_result_count = False
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient_name', )
+    min_num = 1
+    extra = 0
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    search_fields = ('name', 'author', 'tags', 'text')
-    list_filter = ('name', 'author', 'tags')
+    search_fields = ('name', 'author__email', 'author__username')
+    list_filter = ('tags', )
     list_display = (
         'name',
         'author',
-        'text',
-        'image',
         'cooking_time',
-        'add_to_favorites_count'
+        'favorites_count',
+        'cart_count'
     )
+    list_select_related = ('author', )
+    autocomplete_fields = ('author', 'tags')
+    inlines = (RecipeIngredientInline, )
+    show_full_result_count = False
+
+    def save_related(self, request, form, formsets, change):
+        with cart.recipe_changes(form.instance):
+            super().save_related(request, form, formsets, change)
+
 
-    def add_to_favorites_count(self, obj):
-        return obj.favorite.count()
+class UserRecipeAdmin(admin.ModelAdmin):
+    search_fields = ('author__email', 'recipe__name')
+    list_display = ('author', 'recipe')
+    list_select_related = ('author', 'recipe')
+    autocomplete_fields = ('author', 'recipe')
+    show_full_result_count = False
 
 
-class IngredientAdmin(admin.ModelAdmin):
-    search_fields = ('ingredient_name', )
-    list_filter = ('ingredient_name', )
+class SubscriptionAdmin(admin.ModelAdmin):
+    search_fields = ('author__email', 'user__email')
+    list_display = ('author', 'user')
+    list_select_related = ('author', 'user')
+    autocomplete_fields = ('author', 'user')
+    show_full_result_count = False
 
 
 admin.site.empty_value_display = 'значение не задано'
-admin.site.register(Tag)
-admin.site.register(IngredientName)
-admin.site.register(Ingredient)
+admin.site.register(Tag, TagAdmin)
+admin.site.register(IngredientName, IngredientNameAdmin)
 admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
-admin.site.register(Subscription)
+admin.site.register(Favorite, UserRecipeAdmin)
+admin.site.register(ShoppingCart, UserRecipeAdmin)
+admin.site.register(Subscription, SubscriptionAdmin)
 admin.site.register(User, CustomUserAdmin)
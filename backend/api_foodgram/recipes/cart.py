@@ -0,0 +1,106 @@
+"""Суммы ингредиентов в списках покупок.
+
+ShoppingCartTotal хранит для каждого пользователя уже сложенные
+количества ингредиентов из рецептов его корзины, и скачивание списка
+читает только их. Суммы меняются вместе с корзиной: рецепт добавляет
+свои количества при попадании в корзину и вычитает при удалении из
+неё. Поле recipes считает рецепты корзины с ингредиентом, строка
+удаляется, когда их не осталось. Если меняется состав рецепта, который
+лежит в корзинах, его старые количества вычитаются у всех владельцев
+таких корзин, а новые прибавляются.
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Greatest
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingCartTotal
+
+ADD_SQL = (
+    'INSERT INTO recipes_shoppingcarttotal '
+    '(author_id, ingredient_name_id, amount, recipes) '
+    'SELECT cart.author_id, ingredient.ingredient_name_id, '
+    'ingredient.amount, 1 '
+    'FROM recipes_shoppingcart cart '
+    'JOIN recipes_recipeingredient ingredient '
+    'ON ingredient.recipe_id = cart.recipe_id '
+    'WHERE cart.recipe_id = %s{authors} '
+    'ON CONFLICT (author_id, ingredient_name_id) DO UPDATE SET '
+    'amount = recipes_shoppingcarttotal.amount + excluded.amount, '
+    'recipes = recipes_shoppingcarttotal.recipes + 1'
+)
+
+
+def add(recipe_id, author_id=None):
+    """Прибавляет количества рецепта к суммам корзин, где он лежит."""
+    params = [recipe_id]
+    authors = ''
+    if author_id is not None:
+        authors = ' AND cart.author_id = %s'
+        params.append(author_id)
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_SQL.format(authors=authors), params)
+
+
+def subtract(recipe_id, author_id=None):
+    """Вычитает количества рецепта из сумм корзин, где он лежит."""
+    if author_id is None:
+        authors = ShoppingCart.objects.filter(
+            recipe=recipe_id
+        ).values('author')
+    else:
+        authors = [author_id]
+    ingredients = RecipeIngredient.objects.filter(
+        recipe=recipe_id
+    )
+    totals = ShoppingCartTotal.objects.filter(author__in=authors)
+    totals.filter(
+        ingredient_name__in=ingredients.values('ingredient_name')
+    ).update(
+        # Greatest не даёт разошедшимся суммам уйти ниже нуля,
+        # расхождения исправляет reconcile_cart_totals.
+        amount=Greatest(
+            F('amount') - Subquery(
+                ingredients.filter(
+                    ingredient_name=OuterRef('ingredient_name')
+                ).values('amount')
+            ),
+            0
+        ),
+        recipes=Greatest(F('recipes') - 1, 0)
+    )
+    totals.filter(recipes=0).delete()
+
+
+@contextmanager
+def recipe_changes(recipe):
+    """Пересчитывает суммы корзин вокруг изменения состава рецепта."""
+    carted = recipe.cart_count > 0
+    if carted:
+        subtract(recipe.id)
+    yield
+    if carted:
+        add(recipe.id)
+
+
+def expected(authors):
+    """Суммы, посчитанные заново по корзинам authors."""
+    return {
+        (author_id, ingredient_name_id): (amount, recipes)
+        for author_id, ingredient_name_id, amount, recipes in (
+            RecipeIngredient.objects.filter(
+                recipe__cart__author__in=authors
+            ).order_by().values(
+                'recipe__cart__author',
+                'ingredient_name'
+            ).annotate(
+                total=Sum('amount'),
+                total_recipes=Count('id')
+            ).values_list(
+                'recipe__cart__author',
+                'ingredient_name',
+                'total',
+                'total_recipes'
+            )
+        )
+    }
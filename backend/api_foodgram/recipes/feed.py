@@ -0,0 +1,107 @@
+"""Лента подписок: новые рецепты авторов, на которых подписан пользователь.
+
+В Subscription подписчик хранится в поле author, а автор, на которого
+подписались, — в поле user.
+
+Лента читается из FeedEntry одним проходом по индексу
+(follower_id, recipe_id). Строки раскладываются по лентам подписчиков
+при создании рецепта, добавляются при подписке и удаляются при
+отписке. Автор, у которого набралось FEED_FAN_OUT_MAX_RECIPES
+рецептов, отмечается feed_on_read: его рецепты больше не
+раскладываются (при подписке пришлось бы копировать их все), а
+подмешиваются в ленту при чтении. Отметка не снимается, иначе
+рецепты, созданные, пока она стояла, пропали бы из лент.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from recipes.models import FeedEntry, Recipe, Subscription, User
+
+BATCH_SIZE = 1000
+
+
+def fan_out(recipe):
+    # Счётчик в памяти мог отстать, поэтому порог проверяет UPDATE;
+    # запоздавшая отметка лишь разложит ещё несколько рецептов.
+    if recipe.author.recipes_count + 1 >= settings.FEED_FAN_OUT_MAX_RECIPES:
+        User.objects.filter(
+            pk=recipe.author_id,
+            feed_on_read=False,
+            recipes_count__gte=settings.FEED_FAN_OUT_MAX_RECIPES
+        ).update(feed_on_read=True)
+    followers = Subscription.objects.filter(
+        user=recipe.author_id,
+        user__feed_on_read=False
+    ).values_list('author', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(follower_id=follower_id, recipe_id=recipe.id)
+            for follower_id in followers
+        ),
+        batch_size=BATCH_SIZE
+    )
+
+
+def backfill(subscription):
+    recipes = Recipe.objects.filter(
+        author=subscription.user_id,
+        author__feed_on_read=False
+    ).values_list('id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(follower_id=subscription.author_id, recipe_id=recipe_id)
+            for recipe_id in recipes
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune(subscription):
+    FeedEntry.objects.filter(
+        follower=subscription.author_id,
+        recipe__author=subscription.user_id
+    ).delete()
+
+
+def feed(queryset, user):
+    """Рецепты из queryset, попадающие в ленту пользователя, новые первыми.
+
+    Порядок задаётся по recipe_id строки ленты, а не по id рецепта:
+    тогда страница читается из индекса уже отсортированной.
+    """
+    on_read = list(
+        Subscription.objects.filter(
+            author=user,
+            user__feed_on_read=True
+        ).values_list('user', flat=True)
+    )
+    if not on_read:
+        recipes = queryset.filter(feed_entries__follower=user).annotate(
+            feed_position=F('feed_entries__recipe')
+        )
+    else:
+        recipes = queryset.filter(
+            Q(id__in=FeedEntry.objects.filter(follower=user).values('recipe'))
+            | Q(author__in=on_read)
+        ).annotate(feed_position=F('id'))
+    return recipes.order_by('-feed_position')
+
+
+def rebuild(using='default'):
+    """Заполняет ленты заново, например после загрузки в обход сигналов."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM recipes_feedentry')
+        cursor.execute(
+            'UPDATE recipes_user SET feed_on_read = (recipes_count >= %s)',
+            (settings.FEED_FAN_OUT_MAX_RECIPES,)
+        )
+        cursor.execute(
+            'INSERT INTO recipes_feedentry (follower_id, recipe_id) '
+            'SELECT subscription.author_id, recipe.id '
+            'FROM recipes_subscription subscription '
+            'JOIN recipes_user author ON author.id = subscription.user_id '
+            'JOIN recipes_recipe recipe ON recipe.author_id = author.id '
+            'WHERE author.feed_on_read = %s',
+            (False,)
+        )
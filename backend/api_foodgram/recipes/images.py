@@ -0,0 +1,95 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+def rendition_name(name, rendition):
+    stem, _ = os.path.splitext(os.path.basename(name))
+    extension = settings.IMAGE_RENDITION_FORMAT.lower()
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{extension}'
+
+
+def build_renditions(name):
+    """Создаёт недостающие копии изображения и отмечает их у рецептов."""
+    missing = {
+        rendition: size
+        for rendition, size in settings.IMAGE_RENDITIONS.items()
+        if not default_storage.exists(rendition_name(name, rendition))
+    }
+    if missing:
+        save_renditions(name, missing)
+    Recipe.objects.filter(image=name).update(
+        renditions=[
+            rendition_name(name, rendition)
+            for rendition in settings.IMAGE_RENDITIONS
+        ]
+    )
+
+
+def save_renditions(name, missing):
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    for rendition, size in missing.items():
+        copy = image.copy()
+        copy.thumbnail(size)
+        buffer = io.BytesIO()
+        copy.save(buffer, settings.IMAGE_RENDITION_FORMAT)
+        default_storage.save(
+            rendition_name(name, rendition),
+            ContentFile(buffer.getvalue())
+        )
+
+
+def build_renditions_safely(name):
+    try:
+        build_renditions(name)
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s', name)
+    finally:
+        # Соединения потоков пула иначе остаются открытыми навсегда.
+        connections.close_all()
+
+
+def schedule_renditions(name):
+    """Ставит обработку в пул после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: executor.submit(build_renditions_safely, name)
+    )
+
+
+def rendition_urls(recipe):
+    """Ссылки на копии фото, для неготовых — на само фото.
+
+    Готовые копии записаны в recipe.renditions, поэтому хранилище при
+    чтении не опрашивается. Имена копий строятся из имени фото, так что
+    копии прежнего фото после его замены не подходят.
+    """
+    image = recipe.image
+    ready = set(recipe.renditions)
+    urls = {}
+    for rendition in settings.IMAGE_RENDITIONS:
+        name = rendition_name(image.name, rendition)
+        urls[rendition] = (
+            default_storage.url(name) if name in ready else image.url
+        )
+    return urls
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from recipes.images import build_renditions_safely, executor
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие уменьшенные копии фото рецептов '
+        'и отмечает готовые у рецептов.'
+    )
+
+    def handle(self, *args, **options):
+        names = (
+            Recipe.objects.exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        )
+        futures = [
+            executor.submit(build_renditions_safely, name) for name in names
+        ]
+        for future in futures:
+            future.result()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {len(futures)}'
+        ))
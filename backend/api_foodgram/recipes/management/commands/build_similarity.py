@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.similarity import build
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет похожие рецепты для рецептов, состав которых '
+        'изменился с прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help=(
+                'Пересчитать все рецепты, например после изменения '
+                'SIMILAR_RECIPES_COUNT.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = build(options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Изменено рецептов: {stats["outdated"]}, '
+            f'пересчитано списков: {stats["recomputed"]}, '
+            f'дополнено: {stats["merged"]} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,115 @@
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import IngredientName
+
+CHUNK_SIZE = 64 * 1024
+SKIP = re.compile(r'[\s,]*')
+NOT_A_LIST = 'Файл {path} должен содержать JSON-массив'
+UNEXPECTED_END = 'Файл {path} неожиданно закончился'
+
+
+def iter_json_array(stream, path, chunk_size=CHUNK_SIZE):
+    """Читает элементы JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError(NOT_A_LIST.format(path=path))
+    position = 1
+    while True:
+        position = SKIP.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise CommandError(UNEXPECTED_END.format(path=path))
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает наименования ингредиентов из JSON-файла пачками, '
+        'пропуская уже существующие пары (name, measurement_unit).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR / 'ingredient.json',
+            help='Путь к файлу: фикстура Django или список объектов.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть положительным')
+        created = skipped = 0
+        seen = set()
+        started = time.perf_counter()
+        try:
+            with open(path, encoding='utf-8') as stream:
+                items = iter_json_array(stream, path)
+                for batch in iter_batches(items, batch_size):
+                    pairs = []
+                    for item in batch:
+                        fields = item.get('fields', item)
+                        pair = (
+                            fields['name'].strip(),
+                            fields['measurement_unit'].strip()
+                        )
+                        if pair in seen:
+                            skipped += 1
+                            continue
+                        seen.add(pair)
+                        pairs.append(pair)
+                    existing = set(
+                        IngredientName.objects.filter(
+                            name__in={name for name, _ in pairs}
+                        ).values_list('name', 'measurement_unit')
+                    )
+                    new = [
+                        IngredientName(name=name, measurement_unit=unit)
+                        for name, unit in pairs
+                        if (name, unit) not in existing
+                    ]
+                    IngredientName.objects.bulk_create(new)
+                    created += len(new)
+                    skipped += len(pairs) - len(new)
+        except OSError as error:
+            raise CommandError(error)
+        except (KeyError, AttributeError) as error:
+            raise CommandError(f'Некорректная запись ингредиента: {error}')
+        elapsed = time.perf_counter() - started
+        total = created + skipped
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {created}, пропущено: {skipped}, '
+            f'за {elapsed:.2f} с ({total / elapsed:.0f} строк/с)'
+        ))
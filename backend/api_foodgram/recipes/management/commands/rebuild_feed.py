@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново раскладывает рецепты по лентам подписчиков, например '
+        'после загрузки данных в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Алиас базы данных.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuild(options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты перестроены за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.search import search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс рецептов, например после '
+        'загрузки данных в обход сигналов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество id рецептов, обрабатываемых за один запрос.'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Алиас базы данных.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть положительным')
+        started = time.perf_counter()
+        search_backend(options['database']).rebuild_all(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.cart import expected
+from recipes.models import ShoppingCart, ShoppingCartTotal, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает суммы ингредиентов в списках покупок '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество пользователей, проверяемых за один проход.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+
+    def repair(self, authors):
+        """Пересчитывает суммы authors под блокировкой их корзин.
+
+        Пока блокировки держатся, добавление в корзину ждёт блокировки
+        пользователя, а удаление — блокировки строки корзины, так что
+        пересчёт не теряет и не учитывает дважды их изменения.
+        """
+        with transaction.atomic():
+            list(
+                User.objects.select_for_update().filter(
+                    pk__in=authors
+                ).values_list('pk', flat=True)
+            )
+            list(
+                ShoppingCart.objects.select_for_update().filter(
+                    author__in=authors
+                ).values_list('pk', flat=True)
+            )
+            totals = expected(authors)
+            ShoppingCartTotal.objects.filter(author__in=authors).delete()
+            ShoppingCartTotal.objects.bulk_create(
+                ShoppingCartTotal(
+                    author_id=author_id,
+                    ingredient_name_id=ingredient_name_id,
+                    amount=amount,
+                    recipes=recipes
+                )
+                for (author_id, ingredient_name_id), (amount, recipes)
+                in totals.items()
+            )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть положительным')
+        checked = drifted_users = drifted_rows = 0
+        last_pk = 0
+        while True:
+            authors = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk',
+                    flat=True
+                )[:batch_size]
+            )
+            if not authors:
+                break
+            last_pk = authors[-1]
+            checked += len(authors)
+            actual = expected(authors)
+            stored = {
+                (author_id, ingredient_name_id): (amount, recipes)
+                for author_id, ingredient_name_id, amount, recipes in (
+                    ShoppingCartTotal.objects.filter(
+                        author__in=authors
+                    ).values_list(
+                        'author',
+                        'ingredient_name',
+                        'amount',
+                        'recipes'
+                    )
+                )
+            }
+            mismatched = {
+                key for key in actual.keys() | stored.keys()
+                if actual.get(key) != stored.get(key)
+            }
+            drifted = {author_id for author_id, _ in mismatched}
+            if options['verbosity'] > 1:
+                for author_id, ingredient_name_id in sorted(mismatched):
+                    self.stdout.write(
+                        f'пользователь {author_id}, ингредиент '
+                        f'{ingredient_name_id}: хранится '
+                        f'{stored.get((author_id, ingredient_name_id))}, '
+                        f'должно быть '
+                        f'{actual.get((author_id, ingredient_name_id))}'
+                    )
+            drifted_rows += len(mismatched)
+            drifted_users += len(drifted)
+            if drifted and not options['dry_run']:
+                self.repair(drifted)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей проверено: {checked}, с расхождениями: '
+            f'{drifted_users}, строк с расхождениями: {drifted_rows}'
+        ))
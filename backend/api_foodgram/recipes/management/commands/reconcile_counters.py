@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, Recipe, ShoppingCart, User
+
+COUNTERS = (
+    (Recipe, {
+        'favorites_count': (Favorite, 'recipe'),
+        'cart_count': (ShoppingCart, 'recipe'),
+    }),
+    (User, {'recipes_count': (Recipe, 'author')}),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, корзин и рецептов '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, проверяемых за один проход.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+
+    def reconcile(self, model, counters, batch_size, dry_run):
+        checked = repaired = 0
+        last_pk = 0
+        subqueries = {
+            field: count_subquery(*source)
+            for field, source in counters.items()
+        }
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').annotate(
+                    **{
+                        f'actual_{field}': subquery
+                        for field, subquery in subqueries.items()
+                    }
+                ).values('pk', *counters, *[
+                    f'actual_{field}' for field in counters
+                ])[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+            checked += len(batch)
+            drifted = [
+                row['pk'] for row in batch
+                if any(
+                    row[field] != row[f'actual_{field}']
+                    for field in counters
+                )
+            ]
+            repaired += len(drifted)
+            if drifted and not dry_run:
+                model.objects.filter(pk__in=drifted).update(**subqueries)
+        return checked, repaired
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть положительным')
+        for model, counters in COUNTERS:
+            checked, repaired = self.reconcile(
+                model,
+                counters,
+                batch_size,
+                options['dry_run']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: проверено {checked}, '
+                f'расхождений {repaired}'
+            ))
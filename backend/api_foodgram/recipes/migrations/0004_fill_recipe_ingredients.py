@@ -0,0 +1,106 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:02
+
+from django.db import migrations
+from django.db.models import Sum
+
+BATCH_SIZE = 1000
+# Наибольшее значение PositiveSmallIntegerField в PostgreSQL.
+AMOUNT_MAX = 32767
+
+
+def batches(queryset):
+    """Отдаёт строки queryset пачками по BATCH_SIZE в порядке id."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[
+            :BATCH_SIZE
+        ])
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+
+
+def totals(links):
+    # Рецепт мог ссылаться на несколько строк Ingredient с одним
+    # наименованием и разным количеством: такие строки складываются.
+    return links.values(
+        'recipe',
+        'ingredient__ingredient_name'
+    ).annotate(
+        total=Sum('ingredient__amount')
+    ).order_by()
+
+
+def fill_recipe_ingredients(apps, schema_editor):
+    recipe = apps.get_model('recipes', 'Recipe')
+    recipe_ingredient = apps.get_model('recipes', 'RecipeIngredient')
+    links = recipe._meta.get_field('ingredients').remote_field.through
+    overflow = list(
+        totals(links.objects.all()).filter(
+            total__gt=AMOUNT_MAX
+        ).order_by('recipe')
+    )
+    if overflow:
+        raise ValueError(
+            f'Сумма количеств больше {AMOUNT_MAX}, исправьте рецепты и '
+            'повторите миграцию: ' + ', '.join(
+                f'рецепт {row["recipe"]}, наименование '
+                f'{row["ingredient__ingredient_name"]} — {row["total"]}'
+                for row in overflow
+            )
+        )
+    for recipes in batches(recipe.objects.only('id')):
+        rows = totals(links.objects.filter(recipe__in=recipes))
+        recipe_ingredient.objects.bulk_create(
+            recipe_ingredient(
+                recipe_id=row['recipe'],
+                ingredient_name_id=row['ingredient__ingredient_name'],
+                amount=row['total']
+            )
+            for row in rows
+        )
+
+
+def restore_ingredients(apps, schema_editor):
+    recipe = apps.get_model('recipes', 'Recipe')
+    ingredient = apps.get_model('recipes', 'Ingredient')
+    recipe_ingredient = apps.get_model('recipes', 'RecipeIngredient')
+    links = recipe._meta.get_field('ingredients').remote_field.through
+    for rows in batches(recipe_ingredient.objects.all()):
+        pairs = {(row.ingredient_name_id, row.amount) for row in rows}
+        lookup = ingredient.objects.filter(
+            ingredient_name__in={name_id for name_id, _ in pairs},
+            amount__in={amount for _, amount in pairs}
+        )
+        existing = {
+            (item.ingredient_name_id, item.amount): item.id for item in lookup
+        }
+        missing = pairs - existing.keys()
+        if missing:
+            ingredient.objects.bulk_create(
+                ingredient(ingredient_name_id=name_id, amount=amount)
+                for name_id, amount in missing
+            )
+            existing = {
+                (item.ingredient_name_id, item.amount): item.id
+                for item in lookup.all()
+            }
+        links.objects.bulk_create(
+            links(
+                recipe_id=row.recipe_id,
+                ingredient_id=existing[row.ingredient_name_id, row.amount]
+            )
+            for row in rows
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_recipe_ingredients, restore_ingredients),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:10
+
+from django.conf import settings
+from django.db import migrations
+
+POSTGRESQL_INSTALL = (
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    'CREATE INDEX recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+    'UPDATE recipes_recipe SET search_vector = '
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(name, '')), 'A') "
+    "|| setweight(to_tsvector(%(config)s::regconfig, coalesce(text, '')), "
+    "'B')",
+)
+SQLITE_INSTALL = (
+    'CREATE VIRTUAL TABLE recipe_search USING fts5('
+    "name, text, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO recipe_search (rowid, name, text) '
+    'SELECT id, name, text FROM recipes_recipe',
+)
+UNINSTALL = {
+    'postgresql': 'ALTER TABLE recipes_recipe DROP COLUMN search_vector',
+    'sqlite': 'DROP TABLE recipe_search',
+}
+
+
+def install_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    params = {'config': settings.RECIPE_SEARCH_CONFIG}
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            for sql in POSTGRESQL_INSTALL:
+                cursor.execute(sql, params)
+        elif vendor == 'sqlite':
+            for sql in SQLITE_INSTALL:
+                cursor.execute(sql)
+
+
+def uninstall_search(apps, schema_editor):
+    sql = UNINSTALL.get(schema_editor.connection.vendor)
+    if sql:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_remove_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
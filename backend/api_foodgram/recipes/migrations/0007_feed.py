@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feed(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE recipes_user SET feed_on_read = (recipes_count >= %s)',
+            (settings.FEED_FAN_OUT_MAX_RECIPES,)
+        )
+        cursor.execute(
+            'INSERT INTO recipes_feedentry (follower_id, recipe_id) '
+            'SELECT subscription.author_id, recipe.id '
+            'FROM recipes_subscription subscription '
+            'JOIN recipes_user author ON author.id = subscription.user_id '
+            'JOIN recipes_recipe recipe ON recipe.author_id = author.id '
+            'WHERE author.feed_on_read = %s',
+            (False,)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_on_read',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Рецепты попадают в ленты при чтении'),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('follower', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ('-recipe',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('follower', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
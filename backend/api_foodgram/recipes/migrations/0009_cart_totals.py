@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_cart_totals(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO recipes_shoppingcarttotal '
+            '(author_id, ingredient_name_id, amount, recipes) '
+            'SELECT cart.author_id, ingredient.ingredient_name_id, '
+            'SUM(ingredient.amount), COUNT(*) '
+            'FROM recipes_shoppingcart cart '
+            'JOIN recipes_recipeingredient ingredient '
+            'ON ingredient.recipe_id = cart.recipe_id '
+            'GROUP BY cart.author_id, ingredient.ingredient_name_id'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('recipes', models.PositiveIntegerField(verbose_name='Рецептов с ингредиентом')),
+                ('author', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('ingredient_name', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to='recipes.ingredientname', verbose_name='Наименование ингредиента')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Списки покупок',
+                'ordering': ('author', 'ingredient_name'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcarttotal',
+            constraint=models.UniqueConstraint(fields=('author', 'ingredient_name'), name='unique_cart_total'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:48
+
+import django.db.models.deletion
+import recipes.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_cart_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('document', recipes.search.MatchField(db_column='recipe_search', verbose_name='Документ')),
+            ],
+            options={
+                'verbose_name': 'Поисковый индекс рецепта',
+                'verbose_name_plural': 'Поисковый индекс рецептов',
+                'db_table': 'recipe_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_search_entry'),
+    ]
+
+    # ordering у IngredientName был в модели с самого начала, но не
+    # попал в 0001_initial; миграция только догоняет состояние модели.
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredientname',
+            options={'ordering': ('id',), 'verbose_name': 'Наименование ингредиента', 'verbose_name_plural': 'Наименования ингредиентов'},
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
+from recipes.search import MatchField
 
 
 class User(AbstractUser):
@@ -25,12 +26,39 @@ class User(AbstractUser):
         max_length=254,
         verbose_name='Почта'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    feed_on_read = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Рецепты попадают в ленты при чтении'
+    )
+    # Меняются только через update() в сигналах и командах. Полное
+    # сохранение их не пишет: экземпляр, например из кэша токенов,
+    # мог устареть и затёр бы значения в БД.
+    denormalized_fields = ('recipes_count', 'feed_on_read')
 
     class Meta:
         ordering = ('-id',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    def save(self, *args, **kwargs):
+        if (
+            not args and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+            and not self._state.adding and self.pk is not None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
+
 
 class IngredientName(models.Model):
     name = models.CharField(
@@ -51,26 +79,6 @@ class IngredientName(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
-class Ingredient(models.Model):
-    ingredient_name = models.ForeignKey(
-        IngredientName,
-        related_name='ingredient',
-        verbose_name='Наименование ингредиента',
-        on_delete=models.CASCADE
-    )
-    amount = models.PositiveSmallIntegerField(
-        verbose_name='Количество'
-    )
-
-    class Meta:
-        ordering = ('-id',)
-        verbose_name = 'Ингредиент'
-        verbose_name_plural = 'Ингредиенты'
-
-    def __str__(self):
-        return f'{self.ingredient_name} - {self.amount}'
-
-
 class Tag(models.Model):
     name = models.CharField(
         max_length=256,
@@ -108,7 +116,8 @@ class Recipe(models.Model):
         on_delete=models.CASCADE
     )
     ingredients = models.ManyToManyField(
-        Ingredient,
+        IngredientName,
+        through='RecipeIngredient',
         related_name='recipes',
         verbose_name='Ингредиенты'
     )
@@ -126,6 +135,26 @@ class Recipe(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='время приготовления'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+    similarity_outdated = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Похожие рецепты устарели'
+    )
+    renditions = models.JSONField(
+        default=list,
+        editable=False,
+        verbose_name='Готовые копии фото'
+    )
 
     class Meta:
         ordering = ('-id',)
@@ -141,6 +170,94 @@ class Recipe(models.Model):
         return self.name
 
 
+class RecipeSearchEntry(models.Model):
+    """Строка таблицы FTS5 recipe_search, есть только в SQLite."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry',
+        verbose_name='Рецепт'
+    )
+    document = MatchField(
+        db_column='recipe_search',
+        verbose_name='Документ'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'recipe_search'
+        verbose_name = 'Поисковый индекс рецепта'
+        verbose_name_plural = 'Поисковый индекс рецептов'
+
+
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Рецепт'
+    )
+    ingredient_name = models.ForeignKey(
+        IngredientName,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Наименование ингредиента'
+    )
+    amount = models.PositiveSmallIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Ингредиент рецепта'
+        verbose_name_plural = 'Ингредиенты рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient_name'],
+                name='unique_recipe_ingredient'),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient_name} - {self.amount}'
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        # Запросы по рецепту обслуживает индекс unique_similar_recipe.
+        db_index=False,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.similar}'
+
+
 class Subscription(models.Model):
     author = models.ForeignKey(
         User,
@@ -169,6 +286,36 @@ class Subscription(models.Model):
         return f'{self.author } {self.user}'
 
 
+class FeedEntry(models.Model):
+    follower = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        # Запросы по подписчику обслуживает индекс unique_feed_entry.
+        db_index=False,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        ordering = ('-recipe',)
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'recipe'],
+                name='unique_feed_entry'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower} {self.recipe}'
+
+
 class Favorite(models.Model):
     author = models.ForeignKey(
         User,
@@ -223,3 +370,39 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.author } {self.recipe}'
+
+
+class ShoppingCartTotal(models.Model):
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        # Запросы по автору обслуживает индекс unique_cart_total.
+        db_index=False,
+        related_name='cart_totals',
+        verbose_name='Автор'
+    )
+    ingredient_name = models.ForeignKey(
+        IngredientName,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Наименование ингредиента'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+    recipes = models.PositiveIntegerField(
+        verbose_name='Рецептов с ингредиентом'
+    )
+
+    class Meta:
+        ordering = ('author', 'ingredient_name')
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['author', 'ingredient_name'],
+                name='unique_cart_total'),
+        ]
+
+    def __str__(self):
+        return f'{self.author} {self.ingredient_name} - {self.amount}'
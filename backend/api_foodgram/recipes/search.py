@@ -0,0 +1,167 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+В PostgreSQL вектор хранится в столбце recipes_recipe.search_vector
+с GIN-индексом, в SQLite — в виртуальной таблице FTS5 recipe_search,
+где rowid совпадает с id рецепта. Столбец и таблица создаются
+миграцией 0006 только для своей СУБД. Столбец не описан в модели,
+поэтому django.contrib.postgres (и psycopg2) для SQLite не нужны.
+Таблицу FTS5 для соединения с рецептами описывает неуправляемая
+модель RecipeSearchEntry. Индекс обновляется сигналами при сохранении
+рецепта, а после массовой загрузки перестраивается командой
+rebuild_search_index.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import (BooleanField, F, FloatField, Func, Lookup, Q,
+                              TextField, Value)
+from django.db.models.expressions import RawSQL
+
+SEARCH_TOKEN = re.compile(r'\w+')
+
+
+class MatchField(TextField):
+    """Скрытый столбец FTS5 с именем таблицы, по которому идёт MATCH."""
+
+
+@MatchField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class RecipeSearch:
+    """Поиск через icontains для СУБД без поддержки полнотекстового."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=()):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def rebuild(self, first_id, last_id):
+        pass
+
+    def rebuild_all(self, batch_size=1000):
+        """Перестраивает индекс диапазонами id по batch_size рецептов."""
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT min(id), max(id) FROM recipes_recipe')
+            first_id, last_id = cursor.fetchone()
+        if first_id is None:
+            return
+        for start in range(first_id, last_id + 1, batch_size):
+            self.rebuild(start, min(start + batch_size - 1, last_id))
+
+    def update(self, recipe):
+        pass
+
+    def delete(self, recipe_id):
+        pass
+
+    def search(self, queryset, query):
+        """Найденные рецепты с релевантностью в аннотации search_rank."""
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresRecipeSearch(RecipeSearch):
+    vector_sql = (
+        "setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(text, '')), 'B')"
+    )
+    query_sql = 'websearch_to_tsquery(%s::regconfig, %s)'
+
+    def rebuild(self, first_id, last_id):
+        config = settings.RECIPE_SEARCH_CONFIG
+        self.execute(
+            f'UPDATE recipes_recipe SET search_vector = {self.vector_sql} '
+            'WHERE id BETWEEN %s AND %s',
+            (config, config, first_id, last_id)
+        )
+
+    def update(self, recipe):
+        self.rebuild(recipe.id, recipe.id)
+
+    def search(self, queryset, query):
+        params = (settings.RECIPE_SEARCH_CONFIG, query)
+        return queryset.filter(
+            RawSQL(
+                f'recipes_recipe.search_vector @@ {self.query_sql}',
+                params,
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank(recipes_recipe.search_vector, {self.query_sql})',
+                params,
+                output_field=FloatField()
+            )
+        )
+
+
+class SqliteRecipeSearch(RecipeSearch):
+    table = 'recipe_search'
+    # Совпадение в названии весит больше, чем в описании.
+    weights = (10.0, 1.0)
+
+    def rebuild(self, first_id, last_id):
+        self.execute(
+            f'INSERT OR REPLACE INTO {self.table} (rowid, name, text) '
+            'SELECT id, name, text FROM recipes_recipe '
+            'WHERE id BETWEEN %s AND %s',
+            (first_id, last_id)
+        )
+
+    def update(self, recipe):
+        self.execute(
+            f'INSERT OR REPLACE INTO {self.table} (rowid, name, text) '
+            'VALUES (%s, %s, %s)',
+            (recipe.id, recipe.name, recipe.text)
+        )
+
+    def delete(self, recipe_id):
+        self.execute(
+            f'DELETE FROM {self.table} WHERE rowid = %s',
+            (recipe_id,)
+        )
+
+    def match(self, query):
+        """Каждое слово запроса ищется как префикс, слова через AND."""
+        return ' '.join(
+            f'"{token}"*' for token in SEARCH_TOKEN.findall(query)
+        )
+
+    def search(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            ).none()
+        return queryset.filter(
+            search_entry__document__match=match
+        ).annotate(
+            search_rank=-Func(
+                F('search_entry__document'),
+                *(Value(weight) for weight in self.weights),
+                function='bm25',
+                output_field=FloatField()
+            )
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresRecipeSearch,
+    'sqlite': SqliteRecipeSearch,
+}
+
+
+def search_backend(using='default'):
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, RecipeSearch)(connection)
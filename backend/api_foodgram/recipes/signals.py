@@ -0,0 +1,98 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from recipes import cart, feed, similarity
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscription, User
+from recipes.search import search_backend
+
+COUNTERS = (
+    (Favorite, Recipe, 'recipe_id', 'favorites_count'),
+    (ShoppingCart, Recipe, 'recipe_id', 'cart_count'),
+    (Recipe, User, 'author_id', 'recipes_count'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def connect_counter(sender, target, foreign_key, field):
+    def increment(instance, created, **kwargs):
+        if created:
+            change_counter(target, getattr(instance, foreign_key), field, 1)
+
+    def decrement(instance, **kwargs):
+        change_counter(target, getattr(instance, foreign_key), field, -1)
+
+    post_save.connect(increment, sender=sender, weak=False)
+    post_delete.connect(decrement, sender=sender, weak=False)
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+def index_recipe(instance, using, update_fields, **kwargs):
+    if update_fields is not None and not {'name', 'text'} & update_fields:
+        return
+    search_backend(using).update(instance)
+
+
+def unindex_recipe(instance, using, **kwargs):
+    search_backend(using).delete(instance.id)
+
+
+post_save.connect(index_recipe, sender=Recipe)
+post_delete.connect(unindex_recipe, sender=Recipe)
+
+
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+def backfill_feed(instance, created, **kwargs):
+    if created:
+        feed.backfill(instance)
+
+
+def prune_feed(instance, **kwargs):
+    feed.prune(instance)
+
+
+post_save.connect(fan_out_recipe, sender=Recipe)
+post_save.connect(backfill_feed, sender=Subscription)
+post_delete.connect(prune_feed, sender=Subscription)
+
+
+def outdate_similar(instance, update_fields, **kwargs):
+    # Полное сохранение (админка, скрипты) может сопровождаться сменой
+    # ингредиентов; API отмечает рецепт сам, когда состав изменился.
+    if update_fields is None:
+        instance.similarity_outdated = True
+
+
+def forget_similar(instance, **kwargs):
+    similarity.forget(instance)
+
+
+pre_save.connect(outdate_similar, sender=Recipe)
+pre_delete.connect(forget_similar, sender=Recipe)
+
+
+def add_to_cart_totals(instance, created, **kwargs):
+    if created:
+        cart.add(instance.recipe_id, instance.author_id)
+
+
+def subtract_from_cart_totals(instance, **kwargs):
+    # До удаления: при удалении рецепта каскадом ингредиенты рецепта
+    # удаляются раньше, чем post_delete строк корзины.
+    cart.subtract(instance.recipe_id, instance.author_id)
+
+
+post_save.connect(add_to_cart_totals, sender=ShoppingCart)
+pre_delete.connect(subtract_from_cart_totals, sender=ShoppingCart)
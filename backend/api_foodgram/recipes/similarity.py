@@ -0,0 +1,292 @@
+"""Похожие рецепты по набору ингредиентов.
+
+Рецепт — разреженный вектор из нулей и единиц по IngredientName,
+сходство — косинус между векторами: число общих ингредиентов,
+делённое на корень из произведения их количеств. Для каждого рецепта
+в SimilarRecipe хранятся SIMILAR_RECIPES_COUNT ближайших соседей,
+эндпоинт только читает готовые строки.
+
+Сходство считается блоками рецептов: np.bincount по спискам рецептов
+с теми же ингредиентами даёт число общих ингредиентов со всеми
+рецептами сразу. В блоке не больше BLOCK_CELLS пар, поэтому память
+растёт линейно с числом рецептов, а не квадратично.
+
+Рецепты с изменённым составом отмечаются similarity_outdated.
+Обновление пересчитывает их соседей целиком, как и соседей рецептов,
+у которых они были в списке, а в остальные списки только добавляет
+пары с изменёнными рецептами, если те сильнее последнего соседа.
+"""
+import itertools
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+BATCH_SIZE = 1000
+# Матрицы общих ингредиентов и сходства блока занимают по 8 байт
+# на пару, то есть около 64 МБ.
+BLOCK_CELLS = 2 ** 22
+
+
+def chunks(values, size=BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def gather(indptr, values, selected):
+    """Значения строк selected из CSR-массивов и номер строки в selected."""
+    starts = indptr[selected]
+    lengths = indptr[selected + 1] - starts
+    owners = np.repeat(np.arange(len(selected)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(
+        np.cumsum(lengths) - lengths,
+        lengths
+    )
+    return owners, values[np.repeat(starts, lengths) + offsets]
+
+
+def compressed(keys, values, size):
+    order = np.argsort(keys, kind='stable')
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return indptr, values[order]
+
+
+class IngredientVectors:
+    """Матрица рецепт × ингредиент, сжатая по строкам и по столбцам.
+
+    По строкам находятся ингредиенты рецептов блока, по столбцам —
+    все рецепты с этими ингредиентами.
+    """
+
+    def __init__(self, pairs):
+        self.recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        ingredient_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        rows, columns = rows.reshape(-1), columns.reshape(-1)
+        self.size = len(self.recipe_ids)
+        self.row_ptr, self.row_columns = compressed(rows, columns, self.size)
+        self.column_ptr, self.column_rows = compressed(
+            columns,
+            rows,
+            len(ingredient_ids)
+        )
+        self.norms = np.sqrt(np.diff(self.row_ptr))
+
+    @classmethod
+    def load(cls):
+        pairs = RecipeIngredient.objects.order_by().values_list(
+            'recipe_id',
+            'ingredient_name_id'
+        ).iterator(chunk_size=BATCH_SIZE * 10)
+        return cls(
+            np.fromiter(
+                itertools.chain.from_iterable(pairs),
+                dtype=np.int64
+            ).reshape(-1, 2)
+        )
+
+    def positions(self, recipe_ids):
+        """Номера строк рецептов и маска тех, у которых есть ингредиенты."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        rows = np.searchsorted(self.recipe_ids, recipe_ids)
+        found = rows < self.size
+        found[found] = self.recipe_ids[rows[found]] == recipe_ids[found]
+        return rows, found
+
+    def rows(self, recipe_ids):
+        rows, found = self.positions(recipe_ids)
+        return rows[found]
+
+    def blocks(self, rows):
+        size = max(1, BLOCK_CELLS // max(1, self.size))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def similarity(self, block):
+        """Косинусное сходство рецептов блока со всеми рецептами."""
+        owners, columns = gather(self.row_ptr, self.row_columns, block)
+        pair_owners, candidates = gather(
+            self.column_ptr,
+            self.column_rows,
+            columns
+        )
+        shared = np.bincount(
+            owners[pair_owners] * self.size + candidates,
+            minlength=len(block) * self.size
+        ).reshape(len(block), self.size)
+        scores = shared / self.norms
+        del shared
+        scores /= self.norms[block][:, np.newaxis]
+        scores[np.arange(len(block)), block] = 0
+        return scores
+
+    def nearest(self, block, scores, count):
+        """Соседи рецептов блока: списки пар (id рецепта, сходство)."""
+        if self.size > count:
+            columns = np.argpartition(-scores, count, axis=1)[:, :count]
+        else:
+            columns = np.broadcast_to(np.arange(self.size), scores.shape)
+        top = np.take_along_axis(scores, columns, axis=1)
+        order = np.argsort(-top, axis=1, kind='stable')
+        columns = np.take_along_axis(columns, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return {
+            int(self.recipe_ids[row]): [
+                (int(self.recipe_ids[column]), float(score))
+                for column, score in zip(row_columns, row_scores)
+                if score > 0
+            ]
+            for row, row_columns, row_scores in zip(block, columns, top)
+        }
+
+
+def replace(neighbours):
+    with transaction.atomic():
+        for recipe_ids in chunks(list(neighbours)):
+            SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(
+            (
+                SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                              score=score)
+                for recipe_id, similar in neighbours.items()
+                for similar_id, score in similar
+            ),
+            batch_size=BATCH_SIZE
+        )
+
+
+def set_outdated(recipe_ids, outdated):
+    for chunk in chunks(recipe_ids):
+        Recipe.objects.filter(pk__in=chunk).update(
+            similarity_outdated=outdated
+        )
+
+
+def claim(full):
+    """Снимает отметки до чтения составов.
+
+    Рецепт, изменённый во время расчёта, снова получит отметку
+    и будет пересчитан при следующем запуске.
+    """
+    if full:
+        Recipe.objects.update(similarity_outdated=False)
+        return list(Recipe.objects.values_list('id', flat=True))
+    outdated = list(
+        Recipe.objects.filter(
+            similarity_outdated=True
+        ).values_list('id', flat=True)
+    )
+    set_outdated(outdated, False)
+    return outdated
+
+
+def referrers(recipe_ids):
+    """Рецепты, у которых хоть один из recipe_ids в списке похожих."""
+    found = set()
+    for chunk in chunks(recipe_ids):
+        found.update(
+            SimilarRecipe.objects.filter(
+                similar__in=chunk
+            ).order_by().values_list('recipe', flat=True).distinct()
+        )
+    return found - set(recipe_ids)
+
+
+def thresholds(vectors, recomputed, count):
+    """Сходство, которое нужно превзойти, чтобы попасть в список рецепта.
+
+    Для пересчитываемых рецептов — бесконечность, для неполных
+    списков — ноль.
+    """
+    lowest = np.zeros(vectors.size)
+    lists = SimilarRecipe.objects.order_by().values('recipe').annotate(
+        neighbours=Count('id'),
+        lowest=Min('score')
+    ).filter(neighbours__gte=count).values_list('recipe', 'lowest')
+    recipe_ids, scores = [], []
+    for recipe_id, score in lists.iterator():
+        recipe_ids.append(recipe_id)
+        scores.append(score)
+    rows, found = vectors.positions(recipe_ids)
+    lowest[rows[found]] = np.asarray(scores)[found]
+    lowest[recomputed] = np.inf
+    return lowest
+
+
+def merge(candidates, count):
+    """Добавляет пары с изменёнными рецептами в остальные списки."""
+    merged = {}
+    for recipe_ids in chunks(list(candidates)):
+        rows = SimilarRecipe.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('recipe', 'similar', 'score')
+        current = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, similar_id, score in rows:
+            current[recipe_id].append((similar_id, score))
+        for recipe_id, similar in current.items():
+            similar.extend(candidates[recipe_id])
+            similar.sort(key=lambda pair: pair[1], reverse=True)
+            merged[recipe_id] = similar[:count]
+    replace(merged)
+    return len(merged)
+
+
+def build(full=False):
+    """Обновляет похожие рецепты и возвращает, сколько списков изменено."""
+    outdated = claim(full)
+    try:
+        return refresh(outdated, full)
+    except BaseException:
+        set_outdated(outdated, True)
+        raise
+
+
+def refresh(outdated, full):
+    count = settings.SIMILAR_RECIPES_COUNT
+    vectors = IngredientVectors.load()
+    recomputed_ids = set(outdated)
+    if not full:
+        recomputed_ids |= referrers(outdated)
+    recomputed_ids = sorted(recomputed_ids)
+    recomputed = vectors.rows(recomputed_ids)
+    # Рецепты без ингредиентов и удалённые теряют свои списки.
+    replace(
+        dict.fromkeys(
+            set(recomputed_ids)
+            - set(vectors.recipe_ids[recomputed].tolist()),
+            ()
+        )
+    )
+    changed = np.zeros(vectors.size, dtype=bool)
+    changed[vectors.rows(outdated)] = True
+    limits = None if full else thresholds(vectors, recomputed, count)
+    candidates = {}
+    for block in vectors.blocks(recomputed):
+        scores = vectors.similarity(block)
+        replace(vectors.nearest(block, scores, count))
+        if limits is None:
+            continue
+        sources = changed[block]
+        scores = scores[sources]
+        hits, columns = np.nonzero(scores > limits)
+        for recipe_id, similar_id, score in zip(
+                vectors.recipe_ids[columns].tolist(),
+                vectors.recipe_ids[block[sources][hits]].tolist(),
+                scores[hits, columns].tolist()
+        ):
+            candidates.setdefault(recipe_id, []).append((similar_id, score))
+    return {
+        'outdated': len(outdated),
+        'recomputed': len(recomputed_ids),
+        'merged': merge(candidates, count) if candidates else 0,
+    }
+
+
+def forget(recipe):
+    """Отмечает рецепты, у которых удаляемый рецепт был в списке."""
+    Recipe.objects.filter(
+        similar_recipes__similar=recipe.id,
+        similarity_outdated=False
+    ).update(similarity_outdated=True)